@@ -0,0 +1,121 @@
+"""
+Disk cache of extracted document text.
+
+Entries are zlib-compressed and keyed by the SHA-256 of the uploaded file,
+the extractor version and the page/chapter selection, so converting the
+same document again (another voice, a retry) skips extraction entirely.
+The cache is bounded in size; least recently used entries are evicted first.
+"""
+
+import hashlib
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.text_extraction import EXTRACTOR_VERSION
+
+# Directory holding cached text (created by init_extraction_cache)
+CACHE_DIR = Path("cache") / "extracted"
+
+# Total size of compressed entries kept on disk
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
+_stats = {"hits": 0, "misses": 0}
+
+def init_extraction_cache():
+    """Create the cache directory."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+def cache_key(content_hash: str, selection: Optional[List[int]] = None) -> str:
+    """Build the cache key of a document (and optional page/chapter selection)."""
+    selection_part = ",".join(map(str, selection)) if selection is not None else "all"
+    raw = f"{EXTRACTOR_VERSION}:{content_hash}:{selection_part}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def get_cached_text(key: str) -> Optional[str]:
+    """Return cached text for a key, or None on a miss."""
+    path = CACHE_DIR / f"{key}.txt.z"
+    try:
+        data = path.read_bytes()
+        text = zlib.decompress(data).decode("utf-8")
+    except FileNotFoundError:
+        _stats["misses"] += 1
+        return None
+    except (OSError, zlib.error, UnicodeDecodeError) as e:
+        print(f"Discarding unreadable extraction cache entry {path}: {e}")
+        _remove(path)
+        _stats["misses"] += 1
+        return None
+
+    # Refresh modification time so eviction removes least recently used entries
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    _stats["hits"] += 1
+    return text
+
+def store_text(key: str, text: str):
+    """Store compressed text for a key, then evict old entries if needed."""
+    init_extraction_cache()
+    path = CACHE_DIR / f"{key}.txt.z"
+    # Unique per call: concurrent stores of one key (threads or processes) never share it
+    temp_path = path.with_suffix(f".tmp{uuid.uuid4().hex}")
+    data = zlib.compress(text.encode("utf-8"), 6)
+    if len(data) > CACHE_MAX_BYTES:
+        return
+
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not write extraction cache entry {path}: {e}")
+        _remove(temp_path)
+        return
+
+    _evict(CACHE_MAX_BYTES)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and current cache size."""
+    entries = _list_entries()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+        "entries": len(entries),
+        "size_bytes": sum(size for _, size, _ in entries),
+        "max_bytes": CACHE_MAX_BYTES,
+    }
+
+def _list_entries() -> List[tuple]:
+    """Return (mtime, size, path) of every cache entry."""
+    entries = []
+    try:
+        with os.scandir(CACHE_DIR) as scan:
+            for entry in scan:
+                if entry.name.endswith(".txt.z"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        pass
+    return entries
+
+def _evict(max_bytes: int):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    entries = sorted(_list_entries())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+def _remove(path):
+    """Delete a file if it still exists."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,151 @@
+"""
+Document extraction outside the event loop.
+
+PDF and EPUB parsing is CPU-heavy, so each document is extracted in its own
+worker process with a capped address space. At most EXTRACTION_PROCESSES
+documents are extracted at once; the others wait for a slot, and the
+per-document timeout only starts once a document has one. A document that
+times out or crashes its worker only kills its own process, so a
+pathological file cannot stall other requests or take the server down.
+Other formats run in a bounded thread pool.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Set
+
+from app.text_extraction import extract_text, normalize_text
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process memory cap
+    resource = None
+
+# Documents extracted at the same time in worker processes
+EXTRACTION_PROCESSES = 2
+# Worker threads for other formats
+EXTRACTION_THREADS = 4
+# Seconds allowed to extract a single document, once it has a slot
+EXTRACTION_TIMEOUT = 120
+# Address space limit of each extraction process
+EXTRACTION_MEMORY_LIMIT = 1024 * 1024 * 1024  # 1GB
+
+# Formats extracted in worker processes
+PROCESS_EXTENSIONS = {'.pdf', '.epub'}
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+# Running worker processes, killed on shutdown
+_processes: Set[multiprocessing.process.BaseProcess] = set()
+
+# Admission semaphores, one pair per event loop
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+class ExtractionError(RuntimeError):
+    """Extraction was killed (timeout) or its worker process died."""
+
+def extract_normalized_text(file_path: str, selection: Optional[List[int]] = None) -> str:
+    """Extract and normalize text; runs inside an extraction worker."""
+    return normalize_text(extract_text(file_path, selection))
+
+async def run_extraction(
+    file_path: str,
+    selection: Optional[List[int]] = None,
+    timeout: float = EXTRACTION_TIMEOUT
+) -> str:
+    """Extract and normalize the text of a document without blocking the event loop."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in PROCESS_EXTENSIONS:
+        return await run_in_process(extract_normalized_text, file_path, selection, timeout=timeout)
+
+    # Threads cannot be killed: a timeout only frees the waiting request
+    async with _get_slots()["threads"]:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_thread_pool(), extract_normalized_text, file_path, selection)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionError(f"Extraction timed out after {timeout} seconds")
+
+async def run_in_process(func: Callable[..., Any], *args: Any, timeout: float = EXTRACTION_TIMEOUT) -> Any:
+    """Run a picklable function in a dedicated, memory-capped worker process.
+
+    Waits for one of the EXTRACTION_PROCESSES slots first; timeout counts
+    from when the worker starts. On timeout or crash only that worker is
+    killed, and the call is not retried.
+    """
+    async with _get_slots()["processes"]:
+        context = multiprocessing.get_context("spawn")  # never fork the server process
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_worker,
+            args=(sender, EXTRACTION_MEMORY_LIMIT, func, args),
+            daemon=True
+        )
+        process.start()
+        sender.close()
+        _processes.add(process)
+
+        receiving = asyncio.ensure_future(asyncio.to_thread(receiver.recv))
+        try:
+            ok, value = await asyncio.wait_for(asyncio.shield(receiving), timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionError(f"Extraction timed out after {timeout} seconds")
+        except EOFError:
+            raise ExtractionError("Extraction worker crashed (file too complex or memory limit exceeded)")
+        finally:
+            if process.is_alive():
+                process.kill()
+            # Killing the worker unblocks the receiving thread
+            await asyncio.gather(receiving, return_exceptions=True)
+            await asyncio.to_thread(process.join)
+            _processes.discard(process)
+            receiver.close()
+
+    if not ok:
+        raise value
+    return value
+
+def shutdown_extraction_workers():
+    """Kill running extraction processes and stop the thread pool."""
+    global _thread_pool
+    for process in list(_processes):
+        if process.is_alive():
+            process.kill()
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+
+def _worker(connection, memory_limit: int, func: Callable[..., Any], args: tuple):
+    """Worker process entry point: run func and send (ok, result or exception)."""
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    try:
+        result = (True, func(*args))
+    except Exception as e:
+        result = (False, e)
+    try:
+        connection.send(result)
+    except Exception as e:  # unpicklable result or exception
+        connection.send((False, RuntimeError(str(e))))
+    connection.close()
+
+def _get_slots() -> dict:
+    """Return the admission semaphores of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _slots:
+        _slots[loop] = {
+            "processes": asyncio.Semaphore(EXTRACTION_PROCESSES),
+            "threads": asyncio.Semaphore(EXTRACTION_THREADS),
+        }
+    return _slots[loop]
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    """Return the thread pool, starting it on first use."""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=EXTRACTION_THREADS, thread_name_prefix="extraction")
+    return _thread_pool
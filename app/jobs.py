@@ -0,0 +1,76 @@
+"""
+In-memory registry of background conversion jobs.
+
+Jobs let clients submit a document, get a job id back immediately and poll
+for real progress instead of holding an HTTP request open for the whole
+conversion.
+
+Jobs only exist in the memory of the process that created them, so the API
+must run as a single uvicorn worker: with several workers, polling a job
+could reach a process that does not know it.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Coroutine, Dict, Optional, Set
+
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = 3600
+
+JOB_STATUSES = ("pending", "extracting", "synthesizing", "completed", "failed")
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+
+# Keep references to running tasks so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+
+def create_job(filename: str, voice: Optional[str] = None) -> Dict[str, Any]:
+    """Register a new pending job and return it."""
+    _prune_jobs()
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "filename": filename,
+        "voice": voice,
+        "status": "pending",
+        "progress": 0.0,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+    _jobs[job["id"]] = job
+    return job
+
+def update_job(job_id: str, **fields: Any) -> None:
+    """Update fields of an existing job."""
+    job = _jobs.get(job_id)
+    if job is None:
+        return
+    if "status" in fields and fields["status"] not in JOB_STATUSES:
+        raise ValueError(f"Invalid job status: {fields['status']}")
+    job.update(fields)
+    job["updated_at"] = time.time()
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the job, or None if unknown."""
+    job = _jobs.get(job_id)
+    return dict(job) if job is not None else None
+
+def start_job(coroutine: Coroutine) -> asyncio.Task:
+    """Run a job coroutine in the background on the current event loop."""
+    task = asyncio.create_task(coroutine)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+def _prune_jobs() -> None:
+    """Forget finished jobs older than JOB_RETENTION_SECONDS."""
+    limit = time.time() - JOB_RETENTION_SECONDS
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job["status"] in ("completed", "failed") and job["updated_at"] < limit
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
@@ -2,24 +2,41 @@
 FastAPI application for AudioBook conversion.
 """
 
+import asyncio
+import hashlib
+import math
 import os
 import shutil
 import uuid
 from pathlib import Path
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Form
 from fastapi.responses import FileResponse
-from typing import Optional
-from app.text_extraction import extract_text
-from app.tts import generate_audio, generate_audio_chapters, list_french_voices
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.text_extraction import TxtParagraphs, parse_page_ranges
+from app.extraction_pool import run_extraction, shutdown_extraction_workers
+from app.extraction_cache import cache_key, get_cache_stats, get_cached_text, init_extraction_cache, store_text
+from app.tts import EmptyTextError, generate_audio, generate_audio_chapters, init_output_dir, list_french_voices
 from app.database import init_db, save_conversion, update_conversion_status
+from app.jobs import create_job, get_job, start_job, update_job
+from app.timing import describe, load_timing_index, timing_path
 
 app = FastAPI(title="AudioBook App", description="Convert documents to audio", version="0.1.0")
 
-# Initialize database on startup
+# Temporary directory for uploaded files
+UPLOAD_DIR = Path("uploads")
+
+# Initialize storage directories and database on startup
 @app.on_event("startup")
 async def startup_event():
+    UPLOAD_DIR.mkdir(exist_ok=True)
+    init_output_dir()
+    init_extraction_cache()
     await init_db()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_extraction_workers()
+
 @app.get("/")
 async def root():
     return {"message": "AudioBook App API", "version": "0.1.0"}
@@ -28,6 +45,11 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+async def extraction_cache_stats():
+    """Extraction cache hit rate and size."""
+    return get_cache_stats()
+
 @app.get("/voices")
 async def get_voices():
     """List available French voices."""
@@ -37,29 +59,63 @@ async def get_voices():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing voices: {str(e)}")
 
+PAGES_DESCRIPTION = "Pages à convertir pour un PDF, ex. \"120-180\" ou \"1,3,5-7\" (optionnel)"
+CHAPTERS_DESCRIPTION = "Chapitres (ordre de lecture) à convertir pour un EPUB, ex. \"2-4\" (optionnel)"
+
 @app.post("/convert")
 async def convert_file(
     background_tasks: BackgroundTasks,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None, description=PAGES_DESCRIPTION),
+    chapters: Optional[str] = Form(None, description=CHAPTERS_DESCRIPTION)
 ):
     """Convert uploaded file to audio using default voice."""
-    return await _convert_file(file, background_tasks, voice=None)
+    return await _convert_file(file, background_tasks, voice=None, pages=pages, chapters=chapters)
 
 @app.post("/convert-with-voice")
 async def convert_file_with_voice(
     background_tasks: BackgroundTasks,
     voice: str = None,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    pages: Optional[str] = Form(None, description=PAGES_DESCRIPTION),
+    chapters: Optional[str] = Form(None, description=CHAPTERS_DESCRIPTION)
 ):
     """Convert uploaded file to audio with specified voice."""
-    return await _convert_file(file, background_tasks, voice=voice)
+    return await _convert_file(file, background_tasks, voice=voice, pages=pages, chapters=chapters)
 
 
-async def _convert_file(file: UploadFile, background_tasks: BackgroundTasks, voice: str = None):
-    """Internal conversion function."""
+# Uploads are written to disk in blocks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+def _parse_selection(filename: str, pages: Optional[str], chapters: Optional[str]) -> Optional[List[int]]:
+    """Validate the requested page or chapter selection for a file.
+
+    Returns 0-based indices, or None to convert the whole document.
+    """
+    file_extension = Path(filename).suffix.lower()
+    if pages and chapters:
+        raise HTTPException(status_code=400, detail="Use either pages or chapters, not both")
+    if pages and file_extension != '.pdf':
+        raise HTTPException(status_code=400, detail="Page selection is only supported for PDF files")
+    if chapters and file_extension != '.epub':
+        raise HTTPException(status_code=400, detail="Chapter selection is only supported for EPUB files")
+
+    spec = pages or chapters
+    if not spec:
+        return None
+    try:
+        return parse_page_ranges(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid selection: {str(e)}")
+
+
+async def _save_upload(file: UploadFile) -> Tuple[Path, str]:
+    """Validate an upload and stream it to a unique temporary file.
+
+    Returns the temporary path and the SHA-256 hex digest of the content.
+    """
     print(f"[DEBUG] Converting file: {file.filename}")
     print(f"[DEBUG] Content type: {file.content_type}")
-    print(f"[DEBUG] Voice: {voice}")
 
     # Validate file type
     allowed_extensions = ['.pdf', '.epub', '.txt']
@@ -73,78 +129,237 @@ async def _convert_file(file: UploadFile, background_tasks: BackgroundTasks, voi
             detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
         )
 
-    # Validate file size (max 50MB)
+    # Save uploaded file temporarily, validating size (max 50MB) on the way
     max_size = 50 * 1024 * 1024  # 50MB
-    file_content = await file.read()
-    print(f"[DEBUG] File size: {len(file_content)} bytes")
-    if len(file_content) > max_size:
-        print(f"[DEBUG] File too large")
-        raise HTTPException(status_code=413, detail="File too large. Maximum size: 50MB")
-
-    # Save uploaded file temporarily
-    uploads_dir = Path("uploads")
-    uploads_dir.mkdir(exist_ok=True)
-    temp_path = uploads_dir / f"temp_{file.filename}"
+    temp_path = UPLOAD_DIR / f"temp_{uuid.uuid4().hex}_{Path(file.filename).name}"
 
+    size = 0
+    digest = hashlib.sha256()
     try:
         with open(temp_path, "wb") as buffer:
-            buffer.write(file_content)
+            while block := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(block)
+                digest.update(block)
+                if size > max_size:
+                    print(f"[DEBUG] File too large")
+                    raise HTTPException(status_code=413, detail="File too large. Maximum size: 50MB")
+                buffer.write(block)
+    except BaseException:
+        if temp_path.exists():
+            os.unlink(temp_path)
+        raise
 
-        # Extract text
+    print(f"[DEBUG] File size: {size} bytes")
+    return temp_path, digest.hexdigest()
+
+
+async def _run_conversion(
+    temp_path: Path,
+    content_hash: str,
+    filename: str,
+    voice: Optional[str] = None,
+    selection: Optional[List[int]] = None,
+    selection_label: Optional[str] = None,
+    on_progress: Optional[Callable[[str, float], None]] = None
+) -> Dict[str, Any]:
+    """Extract text from a saved upload and synthesize it.
+
+    Extracted text is cached by content_hash (the upload's SHA-256), so a
+    document converted again is not re-extracted. Only the selected pages
+    or chapters are extracted when selection is given; selection_label is
+    appended to the output filename. on_progress, if given, is called as
+    on_progress(status, fraction).
+    """
+    def report(status: str, fraction: float):
+        if on_progress:
+            on_progress(status, fraction)
+
+    print(f"[DEBUG] Voice: {voice}")
+
+    # Extract text (or reuse a previous extraction of the same document)
+    report("extracting", 0.0)
+    cache_hit = False
+    if selection is None and temp_path.suffix.lower() == '.txt':
+        # Plain text is streamed paragraph by paragraph into synthesis;
+        # reading it is as cheap as reading a cache entry, so it is not cached.
+        # An empty file is detected by generate_audio_chapters (EmptyTextError).
+        text = TxtParagraphs(str(temp_path))
+    elif (text := await asyncio.to_thread(get_cached_text, cache_key(content_hash, selection))) is not None:
+        cache_hit = True
+        print(f"[DEBUG] Extraction cache hit for {temp_path}")
+    else:
         try:
             print(f"[DEBUG] Extracting text from {temp_path}")
-            text = extract_text(str(temp_path))
+            # Runs in a worker process with a timeout and memory cap
+            text = await run_extraction(str(temp_path), selection)
             print(f"[DEBUG] Extracted {len(text)} characters")
-            if not text or not text.strip():
-                raise HTTPException(status_code=422, detail="No text could be extracted from the file")
         except Exception as e:
             print(f"[DEBUG] Text extraction failed: {str(e)}")
             raise HTTPException(status_code=422, detail=f"Text extraction failed: {str(e)}")
+        if not text or not text.strip():
+            raise HTTPException(status_code=422, detail="No text could be extracted from the file")
+        await asyncio.to_thread(store_text, cache_key(content_hash, selection), text)
+
+    # Save conversion record
+    conversion_id = await save_conversion(filename)
+
+    # Generate audio
+    base_filename = Path(filename).stem
+    if selection_label:
+        base_filename = f"{base_filename}_{selection_label}"
+    # Unique per conversion, so users converting files with the same name
+    # never overwrite (or download) each other's audio and timing index
+    base_filename = f"{base_filename}_{uuid.uuid4().hex}"
+    report("synthesizing", 0.0)
+    synthesized = {"chars": 0}
+
+    def on_synthesis_progress(done: int, total: int):
+        synthesized["chars"] = done
+        report("synthesizing", done / total if total else 0.0)
 
-        # Save conversion record
-        conversion_id = await save_conversion(file.filename)
-
-        # Generate audio
-        base_filename = Path(file.filename).stem
-        try:
-            print(f"[DEBUG] Generating audio for {base_filename}")
-            audio_path = await generate_audio(text, base_filename, voice)
-            if not audio_path:
-                await update_conversion_status(conversion_id, "failed")
-                raise HTTPException(status_code=500, detail="Audio generation failed. Try again later.")
-
-            print(f"[DEBUG] Audio generated at {audio_path}")
-            await update_conversion_status(conversion_id, "completed")
-
-            # Schedule cleanup of temp file
-            background_tasks.add_task(os.unlink, temp_path)
-
-            # Return result
-            return {
-                "message": "Conversion successful",
-                "audio_file": audio_path,
-                "download_url": f"/download/{Path(audio_path).name}",
-                "voice_used": voice or "default (fr-FR-DeniseNeural)",
-                "text_length": len(text),
-                "conversion_id": conversion_id
-            }
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            print(f"[DEBUG] Audio generation error: {str(e)}")
+    try:
+        print(f"[DEBUG] Generating audio for {base_filename}")
+        audio_path = await generate_audio_chapters(
+            text, base_filename, voice,
+            progress_callback=on_synthesis_progress,
+            total_chars=None if isinstance(text, str) else temp_path.stat().st_size
+        )
+        if not audio_path:
             await update_conversion_status(conversion_id, "failed")
-            raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Audio generation failed. Try again later.")
+
+        print(f"[DEBUG] Audio generated at {audio_path}")
+        await update_conversion_status(conversion_id, "completed")
+
+        return {
+            "message": "Conversion successful",
+            "audio_file": audio_path,
+            "download_url": f"/download/{Path(audio_path).name}",
+            "timing_url": f"/timing/{Path(audio_path).name}" if timing_path(audio_path).exists() else None,
+            "voice_used": voice or "default (fr-FR-DeniseNeural)",
+            "text_length": len(text) if isinstance(text, str) else synthesized["chars"],
+            "extraction_cache_hit": cache_hit,
+            "conversion_id": conversion_id
+        }
 
     except HTTPException:
-        # Re-raise HTTP exceptions
+        raise
+    except EmptyTextError:
+        await update_conversion_status(conversion_id, "failed")
+        raise HTTPException(status_code=422, detail="No text could be extracted from the file")
+    except Exception as e:
+        print(f"[DEBUG] Audio generation error: {str(e)}")
+        await update_conversion_status(conversion_id, "failed")
+        raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(e)}")
+
+
+def _selection_label(pages: Optional[str], chapters: Optional[str]) -> Optional[str]:
+    """Filename suffix describing a partial conversion."""
+    if pages:
+        return f"pages_{pages.replace(',', '_')}"
+    if chapters:
+        return f"chapters_{chapters.replace(',', '_')}"
+    return None
+
+
+async def _convert_file(
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    voice: str = None,
+    pages: Optional[str] = None,
+    chapters: Optional[str] = None
+):
+    """Internal conversion function."""
+    selection = _parse_selection(file.filename, pages, chapters)
+    temp_path, content_hash = await _save_upload(file)
+
+    succeeded = False
+    try:
+        result = await _run_conversion(
+            temp_path, content_hash, file.filename, voice,
+            selection=selection,
+            selection_label=_selection_label(pages, chapters)
+        )
+        succeeded = True
+    except HTTPException:
         raise
     except Exception as e:
-        # Clean up temp file on any error
-        if temp_path.exists():
-            background_tasks.add_task(os.unlink, temp_path)
         print(f"[DEBUG] Conversion error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
+    finally:
+        # Background tasks only run after a successful response
+        if not succeeded:
+            _remove_file(temp_path)
+
+    # Schedule cleanup of temp file
+    background_tasks.add_task(_remove_file, temp_path)
+    return result
+
+
+async def _run_job(
+    job_id: str,
+    temp_path: Path,
+    content_hash: str,
+    filename: str,
+    voice: Optional[str],
+    selection: Optional[List[int]] = None,
+    selection_label: Optional[str] = None
+):
+    """Run a conversion job in the background and record its outcome."""
+    try:
+        result = await _run_conversion(
+            temp_path, content_hash, filename, voice,
+            selection=selection,
+            selection_label=selection_label,
+            on_progress=lambda status, fraction: update_job(job_id, status=status, progress=fraction)
+        )
+        update_job(job_id, status="completed", progress=1.0, result=result)
+    except HTTPException as e:
+        update_job(job_id, status="failed", error=e.detail)
+    except Exception as e:
+        print(f"[DEBUG] Job {job_id} failed: {str(e)}")
+        update_job(job_id, status="failed", error=f"Conversion failed: {str(e)}")
+    finally:
+        _remove_file(temp_path)
+
+
+def _remove_file(path: Path):
+    """Delete a file if it still exists."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+@app.post("/jobs", status_code=202)
+async def create_conversion_job(
+    file: UploadFile = File(...),
+    voice: Optional[str] = Form(None, description="Nom de la voix (optionnel)"),
+    pages: Optional[str] = Form(None, description=PAGES_DESCRIPTION),
+    chapters: Optional[str] = Form(None, description=CHAPTERS_DESCRIPTION)
+):
+    """Start converting a file in the background and return a job id to poll."""
+    selection = _parse_selection(file.filename, pages, chapters)
+    temp_path, content_hash = await _save_upload(file)
+    job = create_job(file.filename, voice)
+    start_job(_run_job(
+        job["id"], temp_path, content_hash, file.filename, voice,
+        selection=selection,
+        selection_label=_selection_label(pages, chapters)
+    ))
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['id']}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_conversion_job(job_id: str):
+    """Get the status, progress and result of a conversion job."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @app.post("/test-voice")
 async def test_voice(
@@ -194,8 +409,53 @@ async def download_file(filename: str):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
 
+    # FileResponse streams the file from disk in chunks
     return FileResponse(
         path=file_path,
-        media_type='application/octet-stream',
+        media_type='audio/mpeg' if file_path.suffix == '.mp3' else 'application/octet-stream',
         filename=filename
     )
+
+@app.get("/timing/{filename}")
+async def get_timing(
+    filename: str,
+    text_offset: Optional[int] = None,
+    audio_time: Optional[float] = None
+):
+    """Map a text position to audio time, or an audio time to a text position.
+
+    text_offset is a character offset in the synthesized text, audio_time is
+    in seconds. Matches include the word itself, so clients can line them up
+    with the text they display. Without either, returns a summary of the
+    timing index.
+    """
+    if text_offset is not None and audio_time is not None:
+        raise HTTPException(status_code=400, detail="Use either text_offset or audio_time, not both")
+
+    try:
+        index = load_timing_index(Path("outputs") / filename)
+    except (OSError, ValueError) as e:
+        print(f"[DEBUG] Unreadable timing index for {filename}: {str(e)}")
+        index = None
+    if index is None:
+        raise HTTPException(status_code=404, detail="No timing information for this file")
+
+    if text_offset is not None:
+        if text_offset < 0:
+            raise HTTPException(status_code=400, detail="text_offset must be non-negative")
+        word = index.word_at_text_offset(text_offset)
+    elif audio_time is not None:
+        if not math.isfinite(audio_time) or audio_time < 0:
+            raise HTTPException(status_code=400, detail="audio_time must be a finite, non-negative number")
+        word = index.word_at_audio_offset(int(audio_time * 1000))
+    else:
+        return describe(index)
+
+    if word is None:
+        # Position before the first word: start of the audio
+        word = index.word_at_text_offset(index.text_offsets[0]) if len(index) else None
+    if word is None:
+        raise HTTPException(status_code=404, detail="No words in timing index")
+
+    word["audio_time"] = word["audio_offset_ms"] / 1000
+    return word
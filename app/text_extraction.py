@@ -1,16 +1,98 @@
 """
 Text extraction module for various document formats.
+
+Parsing libraries (PyMuPDF, ebooklib, BeautifulSoup) are imported inside the
+extractors, so a process only pays for the formats it actually converts.
 """
 
-import fitz  # PyMuPDF
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
+import codecs
+import mmap
 import os
-from typing import Optional
+import posixpath
+import re
+import unicodedata
+import zipfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+# Bump when extraction or normalization output changes (invalidates cached text)
+EXTRACTOR_VERSION = "1"
+
+# Bytes inspected to detect the encoding of a TXT file
+TXT_SAMPLE_SIZE = 64 * 1024  # 64KB
+# Bytes decoded at a time when reading a TXT file
+TXT_BLOCK_SIZE = 1024 * 1024  # 1MB
+
+# Byte order marks, longest first (UTF-32 LE starts like UTF-16 LE)
+TXT_BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+# Maximum number of pages or chapters in a partial conversion
+MAX_SELECTION_ITEMS = 10_000
+
+# XML namespaces used in EPUB packaging files
+EPUB_CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+EPUB_OPF_NS = "{http://www.idpf.org/2007/opf}"
+
+def normalize_text(text: str) -> str:
+    """Normalize extracted text before synthesis.
+
+    Unifies line endings and Unicode composition, drops trailing spaces and
+    collapses runs of blank lines.
+    """
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+def parse_page_ranges(spec: str) -> List[int]:
+    """Parse a 1-based selection such as "1,3,120-180" into sorted 0-based indices.
+
+    Selections covering more than MAX_SELECTION_ITEMS pages or chapters are
+    rejected before any range is expanded.
+    """
+    if not spec or not isinstance(spec, str) or not spec.strip():
+        raise ValueError("Empty selection")
+
+    ranges = []
+    total = 0
+    for part in spec.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                start, end = (int(bound) for bound in part.split("-", 1))
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid selection: {part!r}")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid range: {part!r}")
+        total += end - start + 1
+        if total > MAX_SELECTION_ITEMS:
+            raise ValueError(f"Selection too large (maximum {MAX_SELECTION_ITEMS} pages or chapters)")
+        ranges.append((start, end))
+
+    indices = set()
+    for start, end in ranges:
+        indices.update(range(start - 1, end))
+    return sorted(indices)
+
+def _check_selection(selection: List[int], count: int, unit: str):
+    """Raise ValueError if a selection refers to items past the end of the document."""
+    if selection and selection[-1] >= count:
+        raise ValueError(f"{unit.capitalize()} {selection[-1] + 1} out of range (document has {count} {unit}s)")
+
+def extract_text_from_pdf(file_path: str, pages: Optional[List[int]] = None) -> str:
+    """Extract text from PDF file using PyMuPDF.
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extract text from PDF file using PyMuPDF."""
+    If pages (0-based indices) is given, only those pages are loaded.
+    """
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"PDF file not found: {file_path}")
@@ -18,10 +100,17 @@ def extract_text_from_pdf(file_path: str) -> str:
         if not file_path.lower().endswith('.pdf'):
             raise ValueError(f"File is not a PDF: {file_path}")
 
+        import fitz  # PyMuPDF
+
         doc = fitz.open(file_path)
         text = ""
 
-        for page_num in range(len(doc)):
+        if pages is None:
+            pages = range(len(doc))
+        else:
+            _check_selection(pages, len(doc), "page")
+
+        for page_num in pages:
             page = doc.load_page(page_num)
             page_text = page.get_text()
             text += page_text + "\n"
@@ -32,8 +121,40 @@ def extract_text_from_pdf(file_path: str) -> str:
     except Exception as e:
         raise RuntimeError(f"Error extracting text from PDF {file_path}: {str(e)}")
 
-def extract_text_from_epub(file_path: str) -> str:
-    """Extract text from EPUB file using ebooklib."""
+def _epub_spine(archive: zipfile.ZipFile) -> List[str]:
+    """Return the archive paths of the EPUB spine documents, in reading order."""
+    container = ElementTree.fromstring(archive.read("META-INF/container.xml"))
+    rootfile = container.find(f".//{EPUB_CONTAINER_NS}rootfile").get("full-path")
+    package = ElementTree.fromstring(archive.read(rootfile))
+
+    manifest = {
+        item.get("id"): item.get("href")
+        for item in package.iter(f"{EPUB_OPF_NS}item")
+    }
+    base = posixpath.dirname(rootfile)
+    return [
+        posixpath.normpath(posixpath.join(base, unquote(manifest[itemref.get("idref")])))
+        for itemref in package.iter(f"{EPUB_OPF_NS}itemref")
+        if itemref.get("idref") in manifest
+    ]
+
+def _html_to_text(content: bytes) -> str:
+    """Convert an (X)HTML document to plain text."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.extract()
+    # Get text
+    return soup.get_text()
+
+def extract_text_from_epub(file_path: str, chapters: Optional[List[int]] = None) -> str:
+    """Extract text from EPUB file using ebooklib.
+
+    If chapters (0-based spine indices) is given, only those spine documents
+    are read from the archive and parsed, without loading the whole book.
+    """
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"EPUB file not found: {file_path}")
@@ -41,17 +162,23 @@ def extract_text_from_epub(file_path: str) -> str:
         if not file_path.lower().endswith('.epub'):
             raise ValueError(f"File is not an EPUB: {file_path}")
 
+        if chapters is not None:
+            with zipfile.ZipFile(file_path) as archive:
+                spine = _epub_spine(archive)
+                _check_selection(chapters, len(spine), "chapter")
+                return "\n".join(
+                    _html_to_text(archive.read(spine[index])) for index in chapters
+                ).strip()
+
+        import ebooklib
+        from ebooklib import epub
+
         book = epub.read_epub(file_path)
         text = ""
 
         for item in book.get_items():
             if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                soup = BeautifulSoup(item.get_content(), 'html.parser')
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.extract()
-                # Get text
-                page_text = soup.get_text()
+                page_text = _html_to_text(item.get_content())
                 text += page_text + "\n"
 
         return text.strip()
@@ -59,8 +186,35 @@ def extract_text_from_epub(file_path: str) -> str:
     except Exception as e:
         raise RuntimeError(f"Error extracting text from EPUB {file_path}: {str(e)}")
 
-def extract_text_from_txt(file_path: str) -> str:
-    """Extract text from TXT file."""
+def detect_txt_encoding(sample: bytes, complete: bool = False) -> Tuple[str, int]:
+    """Detect the encoding of a TXT file from a sample of its first bytes.
+
+    Returns the codec name and the length of the byte order mark to skip.
+    Files with a BOM use the matching UTF codec; otherwise the sample is
+    tried as UTF-8 and latin-1 is used if it is not valid UTF-8. Unless
+    complete (the sample is the whole file), a multi-byte character cut at
+    the end of the sample is tolerated.
+    """
+    for bom, encoding in TXT_BOMS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+
+    try:
+        # Incremental decoder tolerates a multi-byte character cut at the end
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+        return "utf-8", 0
+    except UnicodeDecodeError:
+        return "latin-1", 0
+
+def iter_txt_paragraphs(file_path: str, block_size: int = TXT_BLOCK_SIZE) -> Iterator[str]:
+    """Yield a TXT file as paragraph-aligned pieces of text.
+
+    The file is memory-mapped, its encoding detected from the first
+    TXT_SAMPLE_SIZE bytes, and decoded block by block, so it is read only
+    once and memory use does not grow with the file size. Joining the
+    pieces gives back the whole text (without BOM). See _TxtDecoder for
+    files whose first non-UTF-8 byte comes after the sample.
+    """
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"TXT file not found: {file_path}")
@@ -68,31 +222,137 @@ def extract_text_from_txt(file_path: str) -> str:
         if not file_path.lower().endswith('.txt'):
             raise ValueError(f"File is not a TXT: {file_path}")
 
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                encoding, start = detect_txt_encoding(
+                    mapped[:TXT_SAMPLE_SIZE], complete=size <= TXT_SAMPLE_SIZE
+                )
+                decoder = _TxtDecoder(encoding)
+
+                pending = ""
+                for offset in range(start, size, block_size):
+                    pending += decoder.decode(mapped[offset:offset + block_size])
+                    cut = _paragraph_cut(pending, block_size)
+                    if cut:
+                        yield pending[:cut]
+                        pending = pending[cut:]
+
+                pending += decoder.decode(b"", final=True)
+                if pending:
+                    yield pending
 
-    except UnicodeDecodeError:
-        # Try with different encoding
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
-        except Exception as e:
-            raise RuntimeError(f"Error reading TXT file {file_path}: {str(e)}")
     except Exception as e:
         raise RuntimeError(f"Error extracting text from TXT {file_path}: {str(e)}")
 
-def extract_text(file_path: str) -> str:
-    """Extract text from file based on extension."""
+class _TxtDecoder:
+    """Incremental TXT decoder that corrects a wrong UTF-8 guess in one pass.
+
+    Decoding is strict. If UTF-8 fails while everything decoded so far was
+    ASCII, the file was latin-1 with its first accented byte after the
+    detection sample: decoding switches to latin-1 from the pending bytes
+    on. A failure after real UTF-8 text (a corrupt file) replaces the bad
+    bytes instead.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.ascii_only = encoding == "utf-8"
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        buffered = self.decoder.getstate()[0]
+        try:
+            text = self.decoder.decode(data, final=final)
+        except UnicodeDecodeError as e:
+            # Positions are relative to the buffered bytes followed by data
+            data = buffered + data
+            if self.ascii_only and data[:e.start].isascii():
+                self.encoding = "latin-1"
+                self.decoder = codecs.getincrementaldecoder("latin-1")()
+            else:
+                self.decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+            self.ascii_only = False
+            text = self.decoder.decode(data, final=final)
+        if self.ascii_only:
+            self.ascii_only = text.isascii()
+        return text
+
+def _paragraph_cut(text: str, block_size: int) -> int:
+    """Return where to cut pending TXT text: after the last paragraph break.
+
+    Falls back to the last line break, then to a hard cut, once the pending
+    text exceeds block_size characters. Returns 0 to keep accumulating.
+    """
+    ends = [text.rfind(sep) + len(sep) for sep in ("\n\n", "\r\n\r\n") if sep in text]
+    if ends:
+        return max(ends)
+    if len(text) < block_size:
+        return 0
+    cut = text.rfind("\n")
+    return cut + 1 if cut != -1 else len(text)
+
+class TxtParagraphs:
+    """Re-iterable paragraph-aligned pieces of a TXT file.
+
+    Each iteration streams the file again with iter_txt_paragraphs().
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_txt_paragraphs(self.file_path)
+
+def extract_text_from_txt(file_path: str) -> str:
+    """Extract text from TXT file."""
+    return "".join(iter_txt_paragraphs(file_path))
+
+# Registry of extractors by file extension
+EXTRACTORS: Dict[str, Callable[..., str]] = {
+    '.pdf': extract_text_from_pdf,
+    '.epub': extract_text_from_epub,
+    '.txt': extract_text_from_txt,
+}
+
+# Extensions whose extractor accepts a page/chapter selection
+SELECTABLE_EXTENSIONS = {'.pdf', '.epub'}
+
+def register_extractor(extension: str, extractor: Callable[..., str], selectable: bool = False):
+    """Register (or replace) the extractor used for a file extension.
+
+    Selectable extractors take the 0-based selection as second argument.
+    """
+    extension = extension.lower()
+    EXTRACTORS[extension] = extractor
+    if selectable:
+        SELECTABLE_EXTENSIONS.add(extension)
+    else:
+        SELECTABLE_EXTENSIONS.discard(extension)
+
+def extract_text(file_path: str, selection: Optional[List[int]] = None) -> str:
+    """Extract text from file based on extension.
+
+    selection holds 0-based page indices for PDF or spine indices for EPUB;
+    only the selected part of the document is extracted.
+    """
     if not file_path or not isinstance(file_path, str):
         raise ValueError("Invalid file path")
 
     file_path = file_path.strip()
 
-    if file_path.lower().endswith('.pdf'):
-        return extract_text_from_pdf(file_path)
-    elif file_path.lower().endswith('.epub'):
-        return extract_text_from_epub(file_path)
-    elif file_path.lower().endswith('.txt'):
-        return extract_text_from_txt(file_path)
-    else:
+    extension = os.path.splitext(file_path)[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
         raise ValueError(f"Unsupported file format: {file_path}. Supported formats: PDF, EPUB, TXT")
+
+    if selection is None:
+        return extractor(file_path)
+    if extension not in SELECTABLE_EXTENSIONS:
+        raise ValueError(f"Page or chapter selection is not supported for {extension} files")
+    return extractor(file_path, selection)
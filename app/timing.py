@@ -0,0 +1,147 @@
+"""
+Word-level timing index of generated audio files.
+
+Built from the word-boundary events emitted during synthesis, it maps
+positions in the synthesized text to positions in the audio, and back, by
+binary search. Entries are stored in parallel typed arrays (16 bytes per
+word) plus the UTF-8 text of the words, and persisted next to the audio
+file.
+"""
+
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+# File header: magic, format version, number of words
+TIMING_MAGIC = b"ABTI"
+TIMING_VERSION = 2
+_HEADER = struct.Struct("<4sII")
+
+# Extension of timing files, stored next to the audio file
+TIMING_SUFFIX = ".timing"
+
+class TimingIndex:
+    """Sorted (text offset, audio offset, duration, word) entries.
+
+    Text offsets are in characters of the synthesized text, audio offsets
+    and durations in milliseconds. Words are kept as one UTF-8 buffer with
+    the end offset of each word, rather than one string object per word.
+    """
+
+    def __init__(self):
+        self.text_offsets = array("I")
+        self.audio_offsets = array("I")
+        self.durations = array("I")
+        self.word_ends = array("I")
+        self.word_data = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.text_offsets)
+
+    def add(self, text_offset: int, audio_offset: int, duration: int, word: str = ""):
+        """Append a word; offsets must not decrease."""
+        if self.text_offsets and (
+            text_offset < self.text_offsets[-1] or audio_offset < self.audio_offsets[-1]
+        ):
+            raise ValueError("Timing entries must be added in order")
+        if min(text_offset, audio_offset, duration) < 0:
+            raise ValueError("Timing offsets and durations cannot be negative")
+        self.text_offsets.append(text_offset)
+        self.audio_offsets.append(audio_offset)
+        self.durations.append(duration)
+        self.word_data += word.encode("utf-8")
+        self.word_ends.append(len(self.word_data))
+
+    def word_at_text_offset(self, text_offset: int) -> Optional[Dict[str, Any]]:
+        """Return the word starting at or before a text offset."""
+        return self._entry(bisect_right(self.text_offsets, text_offset) - 1)
+
+    def word_at_audio_offset(self, audio_offset: int) -> Optional[Dict[str, Any]]:
+        """Return the word being spoken at (or last started before) an audio offset."""
+        return self._entry(bisect_right(self.audio_offsets, audio_offset) - 1)
+
+    def word(self, index: int) -> str:
+        """Text of the word at an index."""
+        start = self.word_ends[index - 1] if index else 0
+        return self.word_data[start:self.word_ends[index]].decode("utf-8")
+
+    def _entry(self, index: int) -> Optional[Dict[str, Any]]:
+        if index < 0:
+            return None
+        return {
+            "word_index": index,
+            "word": self.word(index),
+            "text_offset": self.text_offsets[index],
+            "audio_offset_ms": self.audio_offsets[index],
+            "duration_ms": self.durations[index],
+        }
+
+    def save(self, path: Union[str, Path]):
+        """Write the index to a binary file."""
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(TIMING_MAGIC, TIMING_VERSION, len(self)))
+            for values in (self.text_offsets, self.audio_offsets, self.durations, self.word_ends):
+                if sys.byteorder != "little":
+                    values = array(values.typecode, values)
+                    values.byteswap()
+                values.tofile(f)
+            f.write(self.word_data)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "TimingIndex":
+        """Read an index written by save().
+
+        Raises ValueError if the file is not a timing index of this version
+        or is truncated.
+        """
+        index = cls()
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"Not a timing index: {path}")
+            magic, version, count = _HEADER.unpack(header)
+            if magic != TIMING_MAGIC or version != TIMING_VERSION:
+                raise ValueError(f"Not a timing index: {path}")
+            try:
+                for values in (index.text_offsets, index.audio_offsets, index.durations, index.word_ends):
+                    values.fromfile(f, count)
+                    if sys.byteorder != "little":
+                        values.byteswap()
+            except EOFError:
+                raise ValueError(f"Truncated timing index: {path}")
+            word_bytes = index.word_ends[-1] if count else 0
+            index.word_data = bytearray(f.read(word_bytes))
+            if len(index.word_data) != word_bytes:
+                raise ValueError(f"Truncated timing index: {path}")
+        return index
+
+def timing_path(audio_path: Union[str, Path]) -> Path:
+    """Path of the timing index stored next to an audio file."""
+    return Path(audio_path).with_suffix(TIMING_SUFFIX)
+
+def load_timing_index(audio_path: Union[str, Path]) -> Optional[TimingIndex]:
+    """Load (and cache) the timing index of an audio file, or None if missing."""
+    path = timing_path(audio_path)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return _load_cached(str(path), mtime)
+
+@lru_cache(maxsize=8)
+def _load_cached(path: str, mtime: float) -> TimingIndex:
+    """Load an index; mtime is part of the cache key so rewrites are picked up."""
+    return TimingIndex.load(path)
+
+def describe(index: TimingIndex) -> Dict[str, Any]:
+    """Summary of an index."""
+    if not len(index):
+        return {"words": 0, "duration_ms": 0}
+    return {
+        "words": len(index),
+        "duration_ms": index.audio_offsets[-1] + index.durations[-1],
+    }
@@ -1,22 +1,66 @@
 """
 Text-to-speech module using Edge-TTS with pyttsx3 fallback.
+
+TTS engines are imported on first use through a small backend registry, so
+importing this module stays cheap.
 """
 
 import asyncio
+import importlib
+import itertools
 import os
-import edge_tts
-import pyttsx3
-from typing import List, Dict, Optional
+import uuid
+from bisect import bisect_right
+from types import ModuleType
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from pathlib import Path
 
-# Output directory for generated audio files
+from app.timing import TimingIndex, timing_path
+
+# Output directory for generated audio files (created by init_output_dir)
 OUTPUT_DIR = Path("outputs")
-OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Registry of TTS backends: name -> module implementing it
+TTS_BACKENDS: Dict[str, str] = {
+    "edge": "edge_tts",
+    "pyttsx3": "pyttsx3",
+}
+
+_loaded_backends: Dict[str, ModuleType] = {}
+
+class EmptyTextError(ValueError):
+    """The text to synthesize contains nothing to say."""
+
+# Maximum number of characters sent to Edge-TTS in a single request
+CHUNK_MAX_CHARS = 3000
+
+# Edge-TTS default output is 48 kbit/s constant bitrate MP3
+EDGE_MP3_BYTES_PER_MS = 6
+
+# Edge-TTS boundary offsets and durations are in 100-nanosecond ticks
+EDGE_TICKS_PER_MS = 10_000
+
+def get_backend(name: str) -> ModuleType:
+    """Return the module of a TTS backend, importing it on first use."""
+    if name not in _loaded_backends:
+        if name not in TTS_BACKENDS:
+            raise ValueError(f"Unknown TTS backend: {name}")
+        _loaded_backends[name] = importlib.import_module(TTS_BACKENDS[name])
+    return _loaded_backends[name]
+
+def register_backend(name: str, module: ModuleType):
+    """Register (or replace) an already imported TTS backend module."""
+    TTS_BACKENDS[name] = module.__name__
+    _loaded_backends[name] = module
+
+def init_output_dir():
+    """Create the output directory for generated audio files."""
+    OUTPUT_DIR.mkdir(exist_ok=True)
 
 async def list_french_voices_edge() -> List[Dict[str, str]]:
     """List available French voices from Edge-TTS."""
     try:
-        voices = await edge_tts.list_voices()
+        voices = await get_backend("edge").list_voices()
         french_voices = []
         for voice in voices:
             if voice.get('Locale', '').startswith('fr-'):
@@ -34,7 +78,7 @@ async def list_french_voices_edge() -> List[Dict[str, str]]:
 def list_french_voices_pyttsx3() -> List[Dict[str, str]]:
     """List available French voices from pyttsx3."""
     try:
-        engine = pyttsx3.init()
+        engine = get_backend("pyttsx3").init()
         voices = engine.getProperty('voices')
         french_voices = []
         for voice in voices:
@@ -59,7 +103,7 @@ async def list_french_voices() -> List[Dict[str, str]]:
 async def generate_audio_edge_tts(text: str, output_path: str, voice: str = "fr-FR-DeniseNeural") -> bool:
     """Generate audio using Edge-TTS."""
     try:
-        communicate = edge_tts.Communicate(text, voice)
+        communicate = get_backend("edge").Communicate(text, voice)
         await communicate.save(output_path)
         return True
     except Exception as e:
@@ -69,7 +113,7 @@ async def generate_audio_edge_tts(text: str, output_path: str, voice: str = "fr-
 def generate_audio_pyttsx3(text: str, output_path: str, voice_index: int = 0) -> bool:
     """Generate audio using pyttsx3 as fallback."""
     try:
-        engine = pyttsx3.init()
+        engine = get_backend("pyttsx3").init()
         
         # Set voice if available
         voices = engine.getProperty('voices')
@@ -84,6 +128,104 @@ def generate_audio_pyttsx3(text: str, output_path: str, voice_index: int = 0) ->
         print(f"pyttsx3 failed: {e}")
         return False
 
+def iter_chunks(pieces: Iterable[str], max_chars: int = CHUNK_MAX_CHARS) -> Iterator[str]:
+    """Group a stream of text pieces into chunks of at most max_chars characters.
+
+    Chunks are cut on paragraph boundaries when possible, then on sentence
+    boundaries, and only as a last resort in the middle of a sentence. Lines
+    split across two pieces are joined back before chunking, up to max_chars
+    characters: longer lines are cut as they arrive, so text without line
+    breaks is chunked in constant memory.
+    """
+    for chunk, _ in _iter_chunk_spans(pieces, max_chars):
+        yield chunk
+
+def _iter_chunk_spans(pieces: Iterable[str], max_chars: int) -> Iterator[Tuple[str, List[Tuple[int, int]]]]:
+    """Like iter_chunks(), also yielding where each chunk line comes from.
+
+    Each chunk comes with a list of (offset in chunk, offset in source)
+    pairs, one per line, where the source is the concatenation of pieces.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+
+    current = ""
+    spans: List[Tuple[int, int]] = []
+    leftover = ""
+    leftover_start = 0
+    for piece in itertools.chain(pieces, [None]):
+        lines = []
+        if piece is None:
+            lines.append((leftover_start, leftover))
+        else:
+            *complete, leftover = (leftover + piece).split("\n")
+            for line in complete:
+                lines.append((leftover_start, line))
+                leftover_start += len(line) + 1
+
+            # An unfinished line longer than a chunk cannot fit in one anyway:
+            # cut it now instead of accumulating it until the next line break
+            start = 0
+            while len(leftover) - start > max_chars:
+                cut = _find_cut(leftover, start, start + max_chars)
+                lines.append((leftover_start, leftover[start:cut]))
+                leftover_start += cut - start
+                start = cut
+            leftover = leftover[start:]
+
+        for line_start, line in lines:
+            paragraph = line.strip()
+            if not paragraph:
+                continue
+            paragraph_start = line_start + len(line) - len(line.lstrip())
+
+            separator = 1 if current else 0
+            if len(current) + separator + len(paragraph) <= max_chars:
+                spans.append((len(current) + separator, paragraph_start))
+                current = f"{current}\n{paragraph}" if current else paragraph
+                continue
+
+            if current:
+                yield current, spans
+            current, spans = "", []
+
+            # Paragraph alone is too long: cut on sentence ends, then hard-cut
+            while len(paragraph) > max_chars:
+                cut = _find_cut(paragraph, 0, max_chars)
+                yield paragraph[:cut].rstrip(), [(0, paragraph_start)]
+                rest = paragraph[cut:]
+                paragraph = rest.lstrip()
+                paragraph_start += cut + len(rest) - len(paragraph)
+            current, spans = paragraph, [(0, paragraph_start)]
+
+    if current:
+        yield current, spans
+
+def _find_cut(text: str, start: int, end: int) -> int:
+    """Where to cut text[start:] before end: after a sentence end, else after a space."""
+    cut = max(text.rfind(sep, start, end) for sep in (". ", "! ", "? ", "; "))
+    if cut <= start:
+        cut = text.rfind(" ", start, end)
+    return cut + 1 if cut > start else end
+
+def _source_offset(spans: List[Tuple[int, int]], chunk_offset: int) -> int:
+    """Map an offset in a chunk to an offset in the source text."""
+    index = bisect_right(spans, (chunk_offset, float("inf"))) - 1
+    line_offset, source_offset = spans[max(index, 0)]
+    return source_offset + chunk_offset - line_offset
+
+def _edge_communicate(edge_tts: ModuleType, text: str, voice: str):
+    """Create an Edge-TTS Communicate that emits word boundary events."""
+    try:
+        return edge_tts.Communicate(text, voice, boundary="WordBoundary")
+    except TypeError:
+        # edge-tts < 7 always emits word boundaries and has no boundary option
+        return edge_tts.Communicate(text, voice)
+
+def split_text(text: str, max_chars: int = CHUNK_MAX_CHARS) -> List[str]:
+    """Split text into chunks of at most max_chars characters (see iter_chunks)."""
+    return list(iter_chunks([text], max_chars))
+
 async def generate_audio(text: str, filename: str, voice: Optional[str] = None) -> Optional[str]:
     """Generate audio from text, trying Edge-TTS first, then pyttsx3.
 
@@ -103,6 +245,7 @@ async def generate_audio(text: str, filename: str, voice: Optional[str] = None)
 
     # Clean filename
     safe_filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    init_output_dir()
     output_path = OUTPUT_DIR / f"{safe_filename}.mp3"
 
     # Try Edge-TTS first
@@ -117,3 +260,127 @@ async def generate_audio(text: str, filename: str, voice: Optional[str] = None)
 
     # Both failed
     return None
+
+async def generate_audio_chapters(
+    text: Union[str, Iterable[str]],
+    filename: str,
+    voice: Optional[str] = None,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    total_chars: Optional[int] = None
+) -> Optional[str]:
+    """Generate audio chunk by chunk, reporting progress after each chunk.
+
+    Long documents are split with iter_chunks() and every chunk is streamed
+    from Edge-TTS straight into the same MP3 file, so progress can be
+    reported while the book is being synthesized. Word boundary events are
+    collected into a TimingIndex (offsets in text and across all chunks)
+    saved next to the MP3, see app.timing. Timing is best effort: malformed
+    events are skipped, and if the index cannot be written the audio is
+    kept without it. Falls back to pyttsx3 for the whole text if Edge-TTS
+    fails; no timing index is written then.
+
+    Args:
+        text: Text to convert to speech, or a re-iterable of text pieces
+            (e.g. TxtParagraphs) that is consumed without joining it
+        filename: Base filename for output (without extension)
+        voice: Voice name to use (optional, will use default if not specified)
+        progress_callback: Called as progress_callback(done_chars, total_chars)
+            after each chunk, and with done_chars == total_chars at the end
+        total_chars: Expected number of characters, used for progress when
+            text is not a string (an estimate is fine)
+
+    Returns:
+        Path to generated audio file, or None if failed
+    """
+    if isinstance(text, str) and (not text or not text.strip()):
+        raise EmptyTextError("Text cannot be empty")
+
+    if not filename or not isinstance(filename, str):
+        raise ValueError("Invalid filename")
+
+    # For streamed pieces, emptiness is only known once the first chunk is read
+    chunks = _iter_chunk_spans([text] if isinstance(text, str) else text, CHUNK_MAX_CHARS)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        raise EmptyTextError("Text cannot be empty")
+    if isinstance(text, str):
+        total_chars = len(text)
+
+    safe_filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    init_output_dir()
+    output_path = OUTPUT_DIR / f"{safe_filename}.mp3"
+    edge_voice = voice or "fr-FR-DeniseNeural"
+
+    index_path = timing_path(output_path)
+    # Written under temporary names and moved into place when complete, so
+    # concurrent conversions and downloads of the same file never see it partial
+    partial_id = uuid.uuid4().hex
+    partial_output = OUTPUT_DIR / f".{safe_filename}.{partial_id}.part"
+    partial_index = OUTPUT_DIR / f".{safe_filename}.{partial_id}.timing.part"
+
+    try:
+        edge_tts = get_backend("edge")
+        timing = TimingIndex()
+        skipped_words = 0
+        done_chars = 0
+        audio_bytes = 0
+        with open(partial_output, "wb") as output:
+            for chunk, spans in itertools.chain([first_chunk], chunks):
+                # Audio of previous chunks shifts this chunk's boundary offsets
+                chunk_start_ms = audio_bytes // EDGE_MP3_BYTES_PER_MS
+                cursor = 0
+                communicate = _edge_communicate(edge_tts, chunk, edge_voice)
+                async for message in communicate.stream():
+                    if message["type"] == "audio":
+                        output.write(message["data"])
+                        audio_bytes += len(message["data"])
+                    elif message["type"] == "WordBoundary":
+                        try:
+                            word = message["text"]
+                            position = chunk.find(word, cursor)
+                            if position == -1:
+                                continue
+                            timing.add(
+                                _source_offset(spans, position),
+                                chunk_start_ms + message["offset"] // EDGE_TICKS_PER_MS,
+                                message["duration"] // EDGE_TICKS_PER_MS,
+                                word
+                            )
+                        except (KeyError, TypeError, ValueError, OverflowError):
+                            skipped_words += 1
+                            continue
+                        cursor = position + len(word)
+                done_chars += len(chunk)
+                if progress_callback:
+                    progress_callback(done_chars, max(total_chars or 0, done_chars))
+        if skipped_words:
+            print(f"Skipped {skipped_words} malformed word boundary events")
+
+        try:
+            timing.save(partial_index)
+            os.replace(partial_index, index_path)
+        except OSError as e:
+            print(f"Could not write timing index, keeping audio without it: {e}")
+            # An index left by a previous conversion would not match the new audio
+            for path in (partial_index, index_path):
+                if path.exists():
+                    os.unlink(path)
+        os.replace(partial_output, output_path)
+        if progress_callback:
+            progress_callback(done_chars, done_chars)
+        return str(output_path)
+    except Exception as e:
+        print(f"Edge-TTS failed: {e}")
+        for path in (partial_output, partial_index):
+            if path.exists():
+                os.unlink(path)
+
+    # Fallback to pyttsx3 (no intermediate progress available)
+    full_text = text if isinstance(text, str) else "".join(text)
+    pyttsx3_output = OUTPUT_DIR / f"{safe_filename}_fallback.wav"
+    if generate_audio_pyttsx3(full_text, str(pyttsx3_output)):
+        if progress_callback:
+            progress_callback(len(full_text), len(full_text))
+        return str(pyttsx3_output)
+
+    return None
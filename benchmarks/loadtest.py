@@ -0,0 +1,432 @@
+"""
+HTTP load test of the AudioBook API.
+
+Starts the API with a stub TTS backend (benchmarks.stub_server), replays a
+weighted mix of /convert, /test-voice, /voices and /download requests with
+generated TXT, PDF and EPUB documents at a target concurrency (PDF and EPUB
+go through the extraction worker processes and the extraction cache, which
+is cold for the first conversion of each document), and prints a JSON report:
+throughput, p50/p95/p99 latency and error rate per endpoint, server
+event-loop lag, and RSS of the API process and of its extraction worker
+processes. Compare reports between releases.
+
+Usage:
+    python -m benchmarks.loadtest --concurrency 16 --duration 30 \\
+        --mix convert=1,test-voice=3,voices=4,download=2 \\
+        --doc-sizes 5000,50000,500000 --doc-formats txt,pdf,epub --output report.json
+"""
+
+import argparse
+import asyncio
+import html
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+ENDPOINTS = ("convert", "test-voice", "voices", "download")
+
+DEFAULT_MIX = "convert=1,test-voice=3,voices=4,download=2"
+DEFAULT_DOC_SIZES = "5000,50000,500000"
+DEFAULT_DOC_FORMATS = "txt,pdf,epub"
+
+# Upload content type of each generated document format
+DOC_CONTENT_TYPES = {
+    "txt": "text/plain",
+    "pdf": "application/pdf",
+    "epub": "application/epub+zip",
+}
+
+# Characters of text per generated PDF page / EPUB chapter
+PDF_PAGE_CHARS = 2500
+EPUB_CHAPTER_CHARS = 20_000
+
+# Seconds between two server metrics samples
+METRICS_INTERVAL = 1.0
+
+# Seconds to wait for the stub server to accept connections
+SERVER_START_TIMEOUT = 30
+
+SAMPLE_SENTENCES = [
+    "Il était une fois un petit village au bord de la mer.",
+    "Les pêcheurs partaient chaque matin avant l'aube.",
+    "Personne ne savait ce que cachait la vieille maison du port.",
+    "Le vent soufflait fort ce soir-là, et la pluie battait les volets.",
+]
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of values (fraction between 0 and 1)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "convert=1,voices=4" into endpoint weights."""
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}, expected one of: {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("Request mix has no positive weight")
+    return mix
+
+def make_document(size: int, rng: random.Random, document_format: str = "txt") -> bytes:
+    """Generate a French document of about size characters, in paragraphs.
+
+    document_format is "txt", "pdf" (PDF_PAGE_CHARS per page, needs PyMuPDF)
+    or "epub" (EPUB_CHAPTER_CHARS per chapter).
+    """
+    if document_format not in DOC_CONTENT_TYPES:
+        raise ValueError(f"Unknown document format {document_format!r}, "
+                         f"expected one of: {', '.join(DOC_CONTENT_TYPES)}")
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = " ".join(rng.choice(SAMPLE_SENTENCES) for _ in range(rng.randint(3, 8)))
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+
+    if document_format == "pdf":
+        return _make_pdf(_group(paragraphs, PDF_PAGE_CHARS))
+    if document_format == "epub":
+        return _make_epub(_group(paragraphs, EPUB_CHAPTER_CHARS))
+    return "\n\n".join(paragraphs).encode("utf-8")
+
+def _group(paragraphs: List[str], max_chars: int) -> List[List[str]]:
+    """Group consecutive paragraphs into sections of about max_chars characters."""
+    sections: List[List[str]] = [[]]
+    length = 0
+    for paragraph in paragraphs:
+        if sections[-1] and length + len(paragraph) > max_chars:
+            sections.append([])
+            length = 0
+        sections[-1].append(paragraph)
+        length += len(paragraph) + 2
+    return sections
+
+def _make_pdf(pages: List[List[str]]) -> bytes:
+    """Build a PDF with one page per group of paragraphs."""
+    try:
+        import pymupdf
+    except ImportError:  # PyMuPDF < 1.24.3 only has the fitz name
+        import fitz as pymupdf
+
+    doc = pymupdf.open()
+    for paragraphs in pages:
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (50, 50, -50, -50), "\n\n".join(paragraphs), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def _make_epub(chapters: List[List[str]]) -> bytes:
+    """Build a minimal EPUB with one spine item per group of paragraphs."""
+    manifest = "".join(
+        f'<item id="c{n}" href="text/ch{n}.xhtml" media-type="application/xhtml+xml"/>'
+        for n in range(len(chapters))
+    )
+    spine = "".join(f'<itemref idref="c{n}"/>' for n in range(len(chapters)))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        archive.writestr("META-INF/container.xml", (
+            '<?xml version="1.0"?><container version="1.0" '
+            'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        archive.writestr("OEBPS/content.opf", (
+            '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0" '
+            'unique-identifier="id"><metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            '<dc:identifier id="id">loadtest</dc:identifier><dc:title>Load test</dc:title>'
+            '<dc:language>fr</dc:language></metadata>'
+            f'<manifest>{manifest}</manifest><spine>{spine}</spine></package>'
+        ))
+        for n, paragraphs in enumerate(chapters):
+            body = "".join(f"<p>{html.escape(paragraph)}</p>" for paragraph in paragraphs)
+            archive.writestr(f"OEBPS/text/ch{n}.xhtml", f"<html><body>{body}</body></html>")
+    return buffer.getvalue()
+
+def summarize(samples: List[Tuple[str, float, Optional[str]]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate (endpoint, latency seconds, error or None) samples per endpoint."""
+    report = {}
+    for endpoint in sorted({sample[0] for sample in samples}):
+        latencies = [latency for name, latency, _ in samples if name == endpoint]
+        errors: Dict[str, int] = {}
+        for name, _, error in samples:
+            if name == endpoint and error is not None:
+                errors[error] = errors.get(error, 0) + 1
+        report[endpoint] = {
+            "requests": len(latencies),
+            "errors": sum(errors.values()),
+            "error_rate": sum(errors.values()) / len(latencies),
+            "errors_by_kind": errors,
+            "throughput_rps": len(latencies) / elapsed,
+            "latency_ms": _distribution([latency * 1000 for latency in latencies]),
+        }
+    return report
+
+def _distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    """Mean, p50/p95/p99 and max of values."""
+    return {
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+    }
+
+class HTTPStatusError(Exception):
+    """Response with an error status code."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+class LoadTest:
+    """Drives concurrent clients against a running API."""
+
+    def __init__(self, base_url: str, mix: Dict[str, float], documents: List[Tuple[str, bytes]],
+                 concurrency: int, duration: float, seed: int = 0):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.documents = documents
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.samples: List[Tuple[str, float, Optional[str]]] = []
+        self.lag_samples: List[float] = []
+        self.rss_samples: List[int] = []
+        self.peak_rss: Dict[str, int] = {"api": 0, "children": 0, "total": 0}
+        self.download_names: List[str] = []
+
+    async def run(self) -> Dict[str, Any]:
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=None)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            _, info = await self._fetch(session, "GET", "/")
+
+            # One conversion up front so /download has something to fetch
+            await self._convert(session)
+            await self._collect_metrics(session)
+            self.samples.clear()
+
+            started = time.perf_counter()
+            deadline = started + self.duration
+            metrics = asyncio.create_task(self._metrics_loop(session))
+            await asyncio.gather(*(self._client(session, deadline) for _ in range(self.concurrency)))
+            elapsed = time.perf_counter() - started
+            metrics.cancel()
+            await self._collect_metrics(session)
+
+        errors = sum(1 for _, _, error in self.samples if error is not None)
+        lag_ms = [lag * 1000 for lag in self.lag_samples]
+        return {
+            "app_version": info.get("version"),
+            "config": {
+                "base_url": self.base_url,
+                "concurrency": self.concurrency,
+                "duration_s": self.duration,
+                "mix": self.mix,
+                "documents": {name: len(content) for name, content in self.documents},
+            },
+            "elapsed_s": elapsed,
+            "requests": len(self.samples),
+            "errors": errors,
+            "error_rate": errors / len(self.samples) if self.samples else 0.0,
+            "throughput_rps": len(self.samples) / elapsed,
+            "endpoints": summarize(self.samples, elapsed),
+            "event_loop_lag_ms": _distribution(lag_ms),
+            # API process only; extraction workers are separate processes
+            "api_rss_mb": {
+                "start": self.rss_samples[0] / 2**20 if self.rss_samples else None,
+                "max": self.peak_rss["api"] / 2**20 if self.rss_samples else None,
+                "end": self.rss_samples[-1] / 2**20 if self.rss_samples else None,
+            },
+            # Peaks of the summed child processes, and of API plus children
+            "child_processes_rss_mb": {
+                "max": self.peak_rss["children"] / 2**20 if self.rss_samples else None,
+            },
+            "total_rss_mb": {
+                "max": self.peak_rss["total"] / 2**20 if self.rss_samples else None,
+            },
+        }
+
+    async def _client(self, session: aiohttp.ClientSession, deadline: float):
+        endpoints = list(self.mix)
+        weights = [self.mix[name] for name in endpoints]
+        while time.perf_counter() < deadline:
+            endpoint = self.rng.choices(endpoints, weights)[0]
+            await getattr(self, "_" + endpoint.replace("-", "_"))(session)
+
+    async def _timed(self, endpoint: str, request) -> Optional[Any]:
+        """Run a request coroutine, record its latency and error (if any)."""
+        started = time.perf_counter()
+        result, error = None, None
+        try:
+            result = await request
+        except HTTPStatusError as e:
+            error = f"HTTP {e.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error = type(e).__name__
+        self.samples.append((endpoint, time.perf_counter() - started, error))
+        return result
+
+    async def _fetch(self, session, method: str, path: str, **kwargs) -> Tuple[bytes, Dict[str, Any]]:
+        """Send a request and read the whole body in chunks; raise on HTTP errors."""
+        async with session.request(method, self.base_url + path, **kwargs) as response:
+            size = 0
+            chunks = []
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+                if response.content_type == "application/json":
+                    chunks.append(chunk)
+            if response.status >= 400:
+                raise HTTPStatusError(response.status)
+            body = b"".join(chunks)
+            return body, json.loads(body) if body else {}
+
+    async def _convert(self, session):
+        name, content = self.rng.choice(self.documents)
+        form = aiohttp.FormData()
+        content_type = DOC_CONTENT_TYPES[name.rsplit(".", 1)[-1]]
+        form.add_field("file", content, filename=name, content_type=content_type)
+        result = await self._timed("convert", self._fetch(session, "POST", "/convert", data=form))
+        if result:
+            self.download_names.append(result[1]["download_url"].rsplit("/", 1)[-1])
+
+    async def _test_voice(self, session):
+        form = aiohttp.FormData()
+        form.add_field("text", self.rng.choice(SAMPLE_SENTENCES))
+        await self._timed("test-voice", self._fetch(session, "POST", "/test-voice", data=form))
+
+    async def _voices(self, session):
+        await self._timed("voices", self._fetch(session, "GET", "/voices"))
+
+    async def _download(self, session):
+        if not self.download_names:
+            return await self._voices(session)
+        name = self.rng.choice(self.download_names)
+        await self._timed("download", self._fetch(session, "GET", f"/download/{name}"))
+
+    async def _metrics_loop(self, session):
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            await self._collect_metrics(session)
+
+    async def _collect_metrics(self, session):
+        """Fetch lag samples and RSS from the stub server, if it exposes them."""
+        try:
+            async with session.get(self.base_url + "/_loadtest/metrics") as response:
+                if response.status != 200:
+                    return
+                metrics = await response.json()
+        except aiohttp.ClientError:
+            return
+        self.lag_samples.extend(metrics["lag_samples"])
+        self.rss_samples.append(metrics["rss_bytes"])
+        for name, peak in metrics["peak_rss_bytes"].items():
+            self.peak_rss[name] = max(self.peak_rss[name], peak)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_stub_server(workdir: str, chars_per_second: float) -> Tuple[subprocess.Popen, str]:
+    """Start benchmarks.stub_server in workdir and wait until it answers."""
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port),
+         "--chars-per-second", str(chars_per_second)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Stub server exited: {process.stderr.read().decode(errors='replace')}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Stub server did not start in time")
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def run_load_test(concurrency: int = 8, duration: float = 10, mix: str = DEFAULT_MIX,
+                  doc_sizes: str = DEFAULT_DOC_SIZES, chars_per_second: float = 50_000,
+                  url: Optional[str] = None, seed: int = 0,
+                  doc_formats: str = DEFAULT_DOC_FORMATS) -> Dict[str, Any]:
+    """Run a load test and return its report.
+
+    Starts a stub server in a temporary directory unless url is given.
+    """
+    rng = random.Random(seed)
+    documents = [
+        (f"document_{size}.{document_format}", make_document(int(size), rng, document_format))
+        for size in doc_sizes.split(",")
+        for document_format in (part.strip() for part in doc_formats.split(","))
+    ]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        if url is None:
+            process, url = start_stub_server(workdir, chars_per_second)
+        try:
+            test = LoadTest(url, parse_mix(mix), documents, concurrency, duration, seed)
+            return asyncio.run(test.run())
+        finally:
+            if process is not None:
+                stop_server(process)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AudioBook API")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--doc-sizes", default=DEFAULT_DOC_SIZES,
+                        help="comma-separated sizes (characters) of generated documents")
+    parser.add_argument("--doc-formats", default=DEFAULT_DOC_FORMATS,
+                        help="comma-separated formats of generated documents (txt, pdf, epub)")
+    parser.add_argument("--chars-per-second", type=float, default=50_000,
+                        help="simulated synthesis speed of the stub TTS backend")
+    parser.add_argument("--url", help="test an already running server instead of starting the stub")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_load_test(args.concurrency, args.duration, args.mix, args.doc_sizes,
+                           args.chars_per_second, args.url, args.seed, args.doc_formats)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+AudioBook API with a local stand-in TTS backend, for load testing.
+
+Registers fake "edge" and "pyttsx3" backends (no network, no audio engine)
+through app.tts.register_backend() and adds a /_loadtest/metrics endpoint
+reporting event-loop lag and memory of the API process and of its child
+processes (PDF/EPUB extraction workers).
+
+Usage:
+    python -m benchmarks.stub_server --port 8000 [--chars-per-second 50000]
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+import types
+from typing import Any, Dict, List
+
+from app import tts
+from app.main import app
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stub audio: bytes written per synthesized character
+STUB_AUDIO_BYTES_PER_CHAR = 60
+
+# Interval between two event-loop lag (and memory) probes
+LAG_PROBE_INTERVAL = 0.05
+
+# Simulated synthesis speed (characters per second), set from the command line
+_settings = {"chars_per_second": 50_000}
+
+_lag_samples: List[float] = []
+
+# Peak RSS since the last metrics call: API process, child processes, both
+_peak_rss = {"api": 0, "children": 0, "total": 0}
+
+class StubCommunicate:
+    """Edge-TTS Communicate stand-in: waits like a network call, emits fake audio."""
+
+    def __init__(self, text: str, voice: str, boundary: str = "SentenceBoundary"):
+        self.text = text
+
+    async def stream(self):
+        await asyncio.sleep(len(self.text) / _settings["chars_per_second"])
+        position = 0
+        for word in self.text.split():
+            position = self.text.index(word, position)
+            yield {
+                "type": "WordBoundary",
+                "offset": position * 100_000,
+                "duration": len(word) * 100_000,
+                "text": word,
+            }
+            position += len(word)
+        yield {"type": "audio", "data": b"\0" * (len(self.text) * STUB_AUDIO_BYTES_PER_CHAR)}
+
+    async def save(self, path: str):
+        with open(path, "wb") as f:
+            async for message in self.stream():
+                if message["type"] == "audio":
+                    f.write(message["data"])
+
+async def _stub_list_voices() -> List[Dict[str, str]]:
+    return [
+        {"Name": "fr-FR-DeniseNeural", "Locale": "fr-FR", "Gender": "Female"},
+        {"Name": "fr-FR-HenriNeural", "Locale": "fr-FR", "Gender": "Male"},
+        {"Name": "fr-CA-SylvieNeural", "Locale": "fr-CA", "Gender": "Female"},
+    ]
+
+class StubEngine:
+    """pyttsx3 engine stand-in without voices."""
+
+    def getProperty(self, name: str) -> Any:
+        return []
+
+    def setProperty(self, name: str, value: Any):
+        pass
+
+    def save_to_file(self, text: str, path: str):
+        with open(path, "wb") as f:
+            f.write(b"\0" * len(text))
+
+    def runAndWait(self):
+        pass
+
+def install_stub_backends():
+    """Replace the real TTS engines with the stubs."""
+    edge = types.ModuleType("stub_edge_tts")
+    edge.Communicate = StubCommunicate
+    edge.list_voices = _stub_list_voices
+    tts.register_backend("edge", edge)
+
+    engine = types.ModuleType("stub_pyttsx3")
+    engine.init = StubEngine
+    tts.register_backend("pyttsx3", engine)
+
+async def _probe_event_loop_lag():
+    """Record how late the event loop wakes up compared to the requested sleep.
+
+    Also samples memory: extraction workers live for a fraction of a second,
+    so sampling only on metrics calls would miss most of them.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        _lag_samples.append(max(time.perf_counter() - start - LAG_PROBE_INTERVAL, 0.0))
+        _sample_rss()
+
+def _sample_rss():
+    """Update the peak RSS of the API process and of its child processes."""
+    api = _rss_bytes()
+    children = _children_rss_bytes()
+    _peak_rss["api"] = max(_peak_rss["api"], api)
+    _peak_rss["children"] = max(_peak_rss["children"], children)
+    _peak_rss["total"] = max(_peak_rss["total"], api + children)
+
+def _rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        return _process_rss_bytes("self")
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        # Peak RSS: kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def _children_rss_bytes() -> int:
+    """Summed resident set size of the direct child processes (0 without /proc)."""
+    total = 0
+    for children in glob.glob("/proc/self/task/*/children"):
+        try:
+            with open(children) as f:
+                pids = f.read().split()
+        except OSError:
+            continue
+        for pid in pids:
+            try:
+                total += _process_rss_bytes(pid)
+            except (OSError, ValueError):  # exited in the meantime
+                pass
+    return total
+
+def _process_rss_bytes(pid: str) -> int:
+    """Resident set size of a process, from /proc (Linux only)."""
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+@app.on_event("startup")
+async def _start_lag_probe():
+    app.state.lag_probe = asyncio.create_task(_probe_event_loop_lag())
+
+@app.get("/_loadtest/metrics", include_in_schema=False)
+async def loadtest_metrics():
+    """Event-loop lag samples (seconds) and peak RSS since the last call, and current RSS.
+
+    rss_bytes only covers the API process; peak_rss_bytes also reports its
+    child processes (extraction workers) and the sum of both.
+    """
+    samples = list(_lag_samples)
+    _lag_samples.clear()
+    _sample_rss()
+    peaks = dict(_peak_rss)
+    _peak_rss.update(api=0, children=0, total=0)
+    return {"lag_samples": samples, "rss_bytes": _rss_bytes(), "peak_rss_bytes": peaks}
+
+def main():
+    parser = argparse.ArgumentParser(description="AudioBook API with a stub TTS backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--chars-per-second", type=float, default=_settings["chars_per_second"],
+                        help="simulated synthesis speed")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    _settings["chars_per_second"] = args.chars_per_second
+    install_stub_backends()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,24 @@
 Streamlit frontend for AudioBook App.
 """
 
+import os
 import streamlit as st
 import requests
 import time
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
-# API base URL
-API_BASE = "http://localhost:8000"
+# API base URL (used by this Streamlit server)
+API_BASE = os.environ.get("AUDIOBOOK_API_BASE", "http://localhost:8000")
+# API URL as seen from the user's browser (download links)
+PUBLIC_API_BASE = os.environ.get("AUDIOBOOK_PUBLIC_API_BASE", API_BASE)
+
+# Voices list is refreshed after this many seconds
+VOICES_CACHE_TTL = 3600
+# Delay between two job status requests
+JOB_POLL_INTERVAL = 1.0
+# Give up polling a job after this many seconds
+JOB_POLL_TIMEOUT = 3600
 
 st.title("🎧 AudioBook App")
 st.write("Convertissez vos documents en audio de qualité")
@@ -20,6 +31,19 @@ if 'voices' not in st.session_state:
     st.session_state.voices = []
 if 'test_audio' not in st.session_state:
     st.session_state.test_audio = None
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+
+@st.cache_resource
+def get_http_session():
+    """Shared HTTP session so connections to the API are kept alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+http = get_http_session()
 
 # Country mapping for French locales
 COUNTRY_NAMES = {
@@ -53,10 +77,10 @@ def get_country_order(country):
     return order.get(country, 99)
 
 # Load voices on app start
-@st.cache_data
+@st.cache_data(ttl=VOICES_CACHE_TTL)
 def load_voices():
     try:
-        response = requests.get(f"{API_BASE}/voices", timeout=10)
+        response = http.get(f"{API_BASE}/voices", timeout=10)
         if response.status_code == 200:
             data = response.json()
             voices = data.get('voices', [])
@@ -117,7 +141,7 @@ if st.button("🔊 Écouter la voix", type="secondary"):
         with st.spinner("Génération de l'audio de test..."):
             try:
                 # Use new /test-voice endpoint
-                response = requests.post(
+                response = http.post(
                     f"{API_BASE}/test-voice",
                     data={
                         'text': test_text,
@@ -177,90 +201,136 @@ uploaded_file = st.file_uploader(
     help="Fichier maximum : 50MB"
 )
 
-if uploaded_file is not None:
-    st.write(f"📄 Fichier sélectionné : **{uploaded_file.name}**")
-    st.write(f"📏 Taille : **{len(uploaded_file.getvalue()) / 1024:.1f} KB**")
-
-    # Convert button
-    if st.button("🚀 Convertir en audio", type="primary"):
-        if not uploaded_file:
-            st.error("Veuillez sélectionner un fichier d'abord.")
-            st.stop()
-
-        with st.spinner("Conversion en cours... Veuillez patienter..."):
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            try:
-                # Prepare file for upload
-                files = {'file': (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-                data = {'voice': selected_voice} if selected_voice else {}
-
-                status_text.text("📤 Envoi du fichier à l'API...")
-                progress_bar.progress(25)
-
-                # Call API
-                endpoint = "/convert-with-voice" if selected_voice else "/convert"
-                response = requests.post(
-                    f"{API_BASE}{endpoint}",
-                    files=files,
-                    data=data,
-                    timeout=300  # 5 minutes timeout
-                )
-
-                progress_bar.progress(75)
-                status_text.text("🎵 Génération de l'audio...")
-
-                if response.status_code == 200:
-                    result = response.json()
-                    st.session_state.conversion_result = result
+def display_result(result):
+    """Show conversion metrics, an audio player and a download link."""
+    st.success("🎉 Conversion réussie !")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.metric("Longueur du texte", f"{result['text_length']} caractères")
+        st.metric("Voix utilisée", result['voice_used'])
+
+    with col2:
+        st.metric("ID de conversion", str(result['conversion_id']))
+        audio_filename = Path(result['audio_file']).name
+        st.metric("Fichier audio", audio_filename)
+
+    # The browser fetches the audio straight from the API, nothing is buffered here
+    download_url = f"{PUBLIC_API_BASE}{result['download_url']}"
+    st.audio(download_url, format='audio/mpeg')
+    st.link_button("📥 Télécharger l'audio", download_url, type="primary")
+
+def poll_job(job_id, progress_bar, status_text):
+    """Poll a conversion job until it finishes, updating the progress bar."""
+    status_labels = {
+        'pending': "⏳ En attente...",
+        'extracting': "📖 Extraction du texte...",
+        'synthesizing': "🎵 Génération de l'audio...",
+    }
+    deadline = time.monotonic() + JOB_POLL_TIMEOUT
+
+    while time.monotonic() < deadline:
+        response = http.get(f"{API_BASE}/jobs/{job_id}", timeout=10)
+        if response.status_code == 404:
+            raise RuntimeError("La conversion n'existe plus sur le serveur.")
+        response.raise_for_status()
+        job = response.json()
+
+        if job['status'] in ('completed', 'failed'):
+            return job
+
+        # Extraction counts for the first 10%, synthesis for the rest
+        fraction = job['progress'] * 0.9 + 0.1 if job['status'] == 'synthesizing' else 0.05
+        progress_bar.progress(min(int(fraction * 100), 99))
+        status_text.text(status_labels.get(job['status'], job['status']))
+        time.sleep(JOB_POLL_INTERVAL)
+
+    raise requests.exceptions.Timeout()
+
+def run_job(job_id):
+    """Follow a job to completion and store its result in the session."""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
 
-                    progress_bar.progress(100)
-                    status_text.text("✅ Conversion terminée !")
+    try:
+        job = poll_job(job_id, progress_bar, status_text)
 
-                    st.success("🎉 Conversion réussie !")
+        if job['status'] == 'completed':
+            progress_bar.progress(100)
+            st.session_state.conversion_result = job['result']
+        else:
+            st.error(f"❌ Erreur de conversion : {job.get('error') or 'Erreur inconnue'}")
 
-                    # Display results
-                    col1, col2 = st.columns(2)
+    except requests.exceptions.Timeout:
+        st.error("⏱️ Timeout : La conversion prend trop de temps. Réessayez avec un fichier plus petit.")
+    except requests.exceptions.ConnectionError:
+        st.error("🔌 Erreur de connexion : Vérifiez que l'API FastAPI est démarrée sur le port 8000.")
+    except Exception as e:
+        st.error(f"❌ Erreur inattendue : {str(e)}")
+    finally:
+        # Stop following the job whatever happened, so a new conversion can be started
+        st.session_state.job_id = None
+        progress_bar.empty()
+        status_text.empty()
 
-                    with col1:
-                        st.metric("Longueur du texte", f"{result['text_length']} caractères")
-                        st.metric("Voix utilisée", result['voice_used'])
+if uploaded_file is not None:
+    st.write(f"📄 Fichier sélectionné : **{uploaded_file.name}**")
+    st.write(f"📏 Taille : **{uploaded_file.size / 1024:.1f} KB**")
+
+    # Optional partial conversion (pages for PDF, chapters for EPUB)
+    selection_field = None
+    file_extension = Path(uploaded_file.name).suffix.lower()
+    if file_extension == '.pdf':
+        selection_field = 'pages'
+        selection = st.text_input(
+            "Pages à convertir (optionnel) :",
+            placeholder="ex. 120-180 ou 1,3,5-7",
+            help="Laissez vide pour convertir tout le document"
+        )
+    elif file_extension == '.epub':
+        selection_field = 'chapters'
+        selection = st.text_input(
+            "Chapitres à convertir (optionnel) :",
+            placeholder="ex. 2-4",
+            help="Numéros des chapitres dans l'ordre de lecture. Laissez vide pour tout convertir"
+        )
 
-                    with col2:
-                        st.metric("ID de conversion", str(result['conversion_id']))
-                        audio_filename = Path(result['audio_file']).name
-                        st.metric("Fichier audio", audio_filename)
+    # Convert button
+    if st.button("🚀 Convertir en audio", type="primary", disabled=st.session_state.job_id is not None):
+        try:
+            # requests builds the whole multipart body in memory (one copy of
+            # the upload, at most 50MB); rewind in case the buffer was read before
+            uploaded_file.seek(0)
+            files = {'file': (uploaded_file.name, uploaded_file, uploaded_file.type)}
+            data = {'voice': selected_voice} if selected_voice else {}
+            if selection_field and selection.strip():
+                data[selection_field] = selection.strip()
+
+            with st.spinner("📤 Envoi du fichier à l'API..."):
+                response = http.post(f"{API_BASE}/jobs", files=files, data=data, timeout=120)
+
+            if response.status_code == 202:
+                st.session_state.job_id = response.json()['job_id']
+                st.session_state.conversion_result = None
+            else:
+                try:
+                    error_detail = response.json().get('detail', 'Erreur inconnue')
+                except ValueError:
+                    error_detail = f"Erreur HTTP {response.status_code}"
+                st.error(f"❌ Erreur de conversion : {error_detail}")
 
-                    # Download section
-                    try:
-                        download_response = requests.get(f"{API_BASE}{result['download_url']}", timeout=30)
-                        if download_response.status_code == 200:
-                            st.download_button(
-                                label="📥 Télécharger l'audio",
-                                data=download_response.content,
-                                file_name=audio_filename,
-                                mime="audio/mpeg",
-                                type="primary"
-                            )
-                        else:
-                            st.error("❌ Erreur lors de la récupération du fichier")
-                    except Exception as e:
-                        st.error(f"❌ Erreur de téléchargement: {str(e)}")
+        except requests.exceptions.Timeout:
+            st.error("⏱️ Timeout : L'envoi du fichier prend trop de temps.")
+        except requests.exceptions.ConnectionError:
+            st.error("🔌 Erreur de connexion : Vérifiez que l'API FastAPI est démarrée sur le port 8000.")
 
-                else:
-                    error_detail = response.json().get('detail', 'Erreur inconnue')
-                    st.error(f"❌ Erreur de conversion : {error_detail}")
+# Resume following a running job (also after a page rerun)
+if st.session_state.job_id:
+    run_job(st.session_state.job_id)
 
-            except requests.exceptions.Timeout:
-                st.error("⏱️ Timeout : La conversion prend trop de temps. Réessayez avec un fichier plus petit.")
-            except requests.exceptions.ConnectionError:
-                st.error("🔌 Erreur de connexion : Vérifiez que l'API FastAPI est démarrée sur le port 8000.")
-            except Exception as e:
-                st.error(f"❌ Erreur inattendue : {str(e)}")
-            finally:
-                progress_bar.empty()
-                status_text.empty()
+if st.session_state.conversion_result:
+    display_result(st.session_state.conversion_result)
 
 # Footer
 st.markdown("---")
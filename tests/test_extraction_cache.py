@@ -0,0 +1,85 @@
+"""
+Unit tests for the extracted-text cache.
+"""
+
+import os
+import pytest
+from app import extraction_cache
+from app.extraction_cache import cache_key, get_cached_text, store_text, get_cache_stats
+from app.text_extraction import normalize_text
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """Use an empty cache directory and fresh counters for every test."""
+    monkeypatch.setattr(extraction_cache, "CACHE_DIR", tmp_path / "extracted")
+    monkeypatch.setattr(extraction_cache, "_stats", {"hits": 0, "misses": 0})
+
+def test_cache_key_depends_on_selection():
+    """Test that whole documents and selections get different keys."""
+    assert cache_key("abc") == cache_key("abc", None)
+    assert cache_key("abc") != cache_key("abc", [0, 1])
+    assert cache_key("abc") != cache_key("abd")
+
+def test_store_and_get_text():
+    """Test a miss followed by a hit."""
+    key = cache_key("abc")
+    assert get_cached_text(key) is None
+
+    store_text(key, "Bonjour à tous\nChapitre 1")
+    assert get_cached_text(key) == "Bonjour à tous\nChapitre 1"
+
+    stats = get_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["entries"] == 1
+
+def test_corrupt_entry_is_a_miss():
+    """Test that unreadable entries are discarded."""
+    key = cache_key("abc")
+    store_text(key, "text")
+    (extraction_cache.CACHE_DIR / f"{key}.txt.z").write_bytes(b"not zlib")
+
+    assert get_cached_text(key) is None
+    assert get_cache_stats()["entries"] == 0
+
+def test_stores_use_unique_temporary_files(monkeypatch):
+    """Test that stores of the same key from one process never share a temporary file."""
+    temp_paths = []
+    os_replace = os.replace
+
+    def replace(source, destination):
+        temp_paths.append(source)
+        os_replace(source, destination)
+
+    monkeypatch.setattr(extraction_cache.os, "replace", replace)
+    key = cache_key("abc")
+    store_text(key, "first")
+    store_text(key, "second")
+
+    assert len(set(temp_paths)) == 2
+    assert get_cached_text(key) == "second"
+
+def test_eviction_removes_least_recently_used(monkeypatch):
+    """Test that the cache stays below its size bound."""
+    keys = [cache_key(str(n)) for n in range(3)]
+    for age, key in enumerate(keys):
+        store_text(key, os.urandom(500).hex())
+        path = extraction_cache.CACHE_DIR / f"{key}.txt.z"
+        os.utime(path, (1000 + age, 1000 + age))
+
+    # Room for three entries only
+    entry_size = get_cache_stats()["size_bytes"] // 3
+    monkeypatch.setattr(extraction_cache, "CACHE_MAX_BYTES", entry_size * 3 + entry_size // 2)
+
+    # Touch the oldest entry so the second one becomes least recently used
+    assert get_cached_text(keys[0]) is not None
+    store_text(cache_key("new"), os.urandom(500).hex())
+
+    assert get_cache_stats()["entries"] == 3
+    assert get_cached_text(keys[0]) is not None
+    assert get_cached_text(keys[1]) is None
+
+def test_normalize_text():
+    """Test line ending, whitespace and blank line normalization."""
+    assert normalize_text("  A  \r\nB\r\n\r\n\r\n\r\nC\n") == "A\nB\n\nC"
+    assert normalize_text("é") == "é"
@@ -0,0 +1,96 @@
+"""
+Unit tests for off-loop document extraction.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import pytest
+from app import extraction_pool
+from app.extraction_pool import ExtractionError, run_extraction, run_in_process, shutdown_extraction_workers
+
+@pytest.fixture(autouse=True)
+def stop_workers():
+    """Kill leftover workers after every test."""
+    yield
+    shutdown_extraction_workers()
+
+def _make_pdf(directory):
+    import fitz
+
+    path = os.path.join(directory, "sample.pdf")
+    doc = fitz.open()
+    for number in range(1, 4):
+        doc.new_page().insert_text((72, 72), f"Page {number}")
+    doc.save(path)
+    doc.close()
+    return path
+
+@pytest.mark.asyncio
+async def test_run_extraction_pdf_in_process():
+    """Test PDF extraction (with selection) in a worker process."""
+    with tempfile.TemporaryDirectory() as directory:
+        text = await run_extraction(_make_pdf(directory), [1])
+    assert text == "Page 2"
+
+@pytest.mark.asyncio
+async def test_run_extraction_error_is_propagated():
+    """Test that extractor errors reach the caller."""
+    with pytest.raises(RuntimeError, match="not found"):
+        await run_extraction("missing.pdf")
+
+@pytest.mark.asyncio
+async def test_timeout_kills_worker_and_recovers():
+    """Test that a stuck extraction is killed and later calls still work."""
+    started = time.monotonic()
+    with pytest.raises(ExtractionError, match="timed out"):
+        await run_in_process(time.sleep, 30, timeout=1)
+    assert time.monotonic() - started < 10
+
+    assert await run_in_process(sum, [1, 2, 3]) == 6
+
+@pytest.mark.asyncio
+async def test_queued_calls_do_not_time_out(monkeypatch):
+    """Test that waiting for a free worker does not count against the timeout."""
+    monkeypatch.setattr(extraction_pool, "EXTRACTION_PROCESSES", 2)
+    results = await asyncio.gather(
+        *(run_in_process(time.sleep, 2, timeout=3) for _ in range(4)),
+        return_exceptions=True
+    )
+    assert results == [None] * 4
+
+@pytest.mark.asyncio
+async def test_crash_only_fails_its_own_call():
+    """Test that a crashing worker does not affect other extractions."""
+    crash, healthy = await asyncio.gather(
+        run_in_process(os._exit, 1),
+        run_in_process(sum, [1, 2]),
+        return_exceptions=True
+    )
+    assert isinstance(crash, ExtractionError)
+    assert healthy == 3
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive():
+    """Test that the event loop keeps running while a worker is busy."""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await run_in_process(time.sleep, 1)
+    task.cancel()
+    assert ticks > 20
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(extraction_pool.resource is None, reason="memory cap needs the resource module")
+async def test_memory_cap(monkeypatch):
+    """Test that a worker cannot allocate past the memory limit."""
+    monkeypatch.setattr(extraction_pool, "EXTRACTION_MEMORY_LIMIT", 512 * 1024 * 1024)
+    with pytest.raises(MemoryError):
+        await run_in_process(bytearray, 1024 * 1024 * 1024)
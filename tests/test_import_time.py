@@ -0,0 +1,67 @@
+"""
+Import-time benchmark: importing the API must stay cheap.
+
+Runs `python -X importtime -c "import app.main"` in a clean interpreter and
+checks that heavy extraction and TTS libraries are only loaded on first use,
+and that the API costs little more to import than FastAPI itself.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported by `import app.main`
+LAZY_MODULES = ["fitz", "pymupdf", "ebooklib", "bs4", "edge_tts", "pyttsx3"]
+
+# Allowed cumulative import time of app.main, relative to a bare `import fastapi`
+# (about 1.25 with lazy backends; importing PyMuPDF or edge-tts eagerly exceeds it)
+IMPORT_TIME_BUDGET = 1.5
+
+# Runs per measurement; the fastest is kept to filter out scheduling noise
+IMPORT_TIME_RUNS = 3
+
+def _import_times(module: str, cwd: str) -> dict:
+    """Return {module name: cumulative import time in microseconds}."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def test_app_import_skips_heavy_backends():
+    """Test that importing the API does not load extraction or TTS engines."""
+    with tempfile.TemporaryDirectory() as cwd:
+        times = _import_times("app.main", cwd)
+
+    assert "app.main" in times
+    loaded = [name for name in times if name.split(".")[0] in LAZY_MODULES]
+    assert loaded == []
+
+def test_app_import_has_no_side_effects():
+    """Test that importing the API does not create directories."""
+    with tempfile.TemporaryDirectory() as cwd:
+        _import_times("app.main", cwd)
+        assert os.listdir(cwd) == []
+
+def test_app_import_time_budget():
+    """Test that importing the API stays within its budget over FastAPI."""
+    with tempfile.TemporaryDirectory() as cwd:
+        fastapi_time = min(_import_times("fastapi", cwd)["fastapi"] for _ in range(IMPORT_TIME_RUNS))
+        app_time = min(_import_times("app.main", cwd)["app.main"] for _ in range(IMPORT_TIME_RUNS))
+
+    ratio = app_time / fastapi_time
+    assert ratio <= IMPORT_TIME_BUDGET, (
+        f"import app.main takes {app_time / 1000:.1f} ms, "
+        f"{ratio:.2f}x import fastapi ({fastapi_time / 1000:.1f} ms)"
+    )
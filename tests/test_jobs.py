@@ -0,0 +1,95 @@
+"""
+Unit tests for the background jobs registry.
+"""
+
+import time
+import types
+import pytest
+from fastapi.testclient import TestClient
+from app import tts
+from app.jobs import create_job, get_job, update_job, start_job
+from app.main import app
+from tests.test_tts import FakeCommunicate
+
+def test_create_job():
+    """Test that a new job starts pending with no progress."""
+    job = create_job("book.pdf", "fr-FR-HenriNeural")
+    assert job["status"] == "pending"
+    assert job["progress"] == 0.0
+    assert get_job(job["id"])["filename"] == "book.pdf"
+
+def test_update_job():
+    """Test updating job status and progress."""
+    job = create_job("book.pdf")
+    update_job(job["id"], status="synthesizing", progress=0.5)
+    assert get_job(job["id"])["status"] == "synthesizing"
+    assert get_job(job["id"])["progress"] == 0.5
+
+def test_update_job_invalid_status():
+    """Test error handling for unknown statuses."""
+    job = create_job("book.pdf")
+    with pytest.raises(ValueError):
+        update_job(job["id"], status="unknown")
+
+def test_get_unknown_job():
+    """Test that unknown jobs return None."""
+    assert get_job("does-not-exist") is None
+
+@pytest.mark.asyncio
+async def test_start_job():
+    """Test running a job coroutine in the background."""
+    job = create_job("book.txt")
+
+    async def work():
+        update_job(job["id"], status="completed", progress=1.0)
+
+    await start_job(work())
+    assert get_job(job["id"])["status"] == "completed"
+
+def _wait_for_job(client, status_url, timeout=10):
+    """Poll a job until it finishes (or timeout seconds pass) and return it."""
+    deadline = time.monotonic() + timeout
+    job = client.get(status_url).json()
+    while job["status"] not in ("completed", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(status_url).json()
+    return job
+
+def test_job_endpoints(tmp_path, monkeypatch):
+    """Test submitting a file to POST /jobs and polling GET /jobs/{id} to completion."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(tts._loaded_backends, "edge", types.SimpleNamespace(Communicate=FakeCommunicate))
+    text = "Premier paragraphe.\n\nSecond paragraphe, un peu plus long."
+
+    with TestClient(app) as client:
+        response = client.post("/jobs", files={"file": ("livre.txt", text.encode("utf-8"), "text/plain")})
+        assert response.status_code == 202
+        status_url = response.json()["status_url"]
+
+        job = _wait_for_job(client, status_url)
+        assert job["status"] == "completed", job["error"]
+        assert job["progress"] == 1.0
+        audio = client.get(job["result"]["download_url"])
+        assert audio.status_code == 200
+        assert len(audio.content) == 6 * len(text.replace("\n\n", "\n"))
+
+        assert client.get("/jobs/does-not-exist").status_code == 404
+
+def test_jobs_with_the_same_file_name(tmp_path, monkeypatch):
+    """Test that two users converting files with the same name get their own audio."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(tts._loaded_backends, "edge", types.SimpleNamespace(Communicate=FakeCommunicate))
+    texts = ["Un livre assez long pour se distinguer de l'autre.", "Court."]
+
+    with TestClient(app) as client:
+        status_urls = [
+            client.post("/jobs", files={"file": ("livre.txt", text.encode("utf-8"), "text/plain")}).json()["status_url"]
+            for text in texts
+        ]
+        results = [_wait_for_job(client, status_url)["result"] for status_url in status_urls]
+
+        assert results[0]["download_url"] != results[1]["download_url"]
+        for text, result in zip(texts, results):
+            assert len(client.get(result["download_url"]).content) == 6 * len(text)
+            timing = client.get(result["timing_url"], params={"text_offset": 0}).json()
+            assert timing["word"] == text.split()[0]
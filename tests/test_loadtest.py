@@ -0,0 +1,64 @@
+"""
+Unit tests for the HTTP load-testing harness.
+"""
+
+import random
+import pytest
+from app.text_extraction import extract_text
+from benchmarks.loadtest import make_document, parse_mix, percentile, run_load_test, summarize
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) is None
+
+def test_parse_mix():
+    """Test parsing endpoint weights."""
+    assert parse_mix("convert=1, voices=4,download") == {"convert": 1.0, "voices": 4.0, "download": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("health=1")
+    with pytest.raises(ValueError):
+        parse_mix("voices=0")
+
+def test_make_document():
+    """Test that generated documents have the requested size."""
+    document = make_document(10_000, random.Random(0)).decode("utf-8")
+    assert 10_000 <= len(document) < 11_000
+    assert "\n\n" in document
+    with pytest.raises(ValueError):
+        make_document(100, random.Random(0), "docx")
+
+@pytest.mark.parametrize("document_format", ["pdf", "epub"])
+def test_make_document_formats(tmp_path, document_format):
+    """Test that generated PDF and EPUB documents extract to the same text."""
+    path = tmp_path / f"document.{document_format}"
+    path.write_bytes(make_document(10_000, random.Random(0), document_format))
+    text = make_document(10_000, random.Random(0)).decode("utf-8")
+    assert extract_text(str(path)).split() == text.split()
+
+def test_summarize():
+    """Test aggregation of samples per endpoint."""
+    samples = [("voices", 0.010, None), ("voices", 0.030, "HTTP 500"), ("convert", 1.0, None)]
+    report = summarize(samples, elapsed=2.0)
+    assert report["voices"]["requests"] == 2
+    assert report["voices"]["errors_by_kind"] == {"HTTP 500": 1}
+    assert report["voices"]["error_rate"] == 0.5
+    assert report["voices"]["latency_ms"]["max"] == pytest.approx(30)
+    assert report["convert"]["throughput_rps"] == 0.5
+
+def test_run_load_test_against_stub_server():
+    """Test a short run against the stub server (starts a subprocess)."""
+    report = run_load_test(concurrency=2, duration=1, doc_sizes="2000", doc_formats="txt,pdf",
+                           mix="convert=1,voices=1,download=1")
+    assert report["requests"] > 0
+    assert report["errors"] == 0
+    assert set(report["endpoints"]) <= {"convert", "voices", "download"}
+    assert report["api_rss_mb"]["max"] > 0
+    # PDF/EPUB documents are extracted in worker processes, counted separately
+    assert report["child_processes_rss_mb"]["max"] > 0
+    assert report["total_rss_mb"]["max"] >= report["api_rss_mb"]["max"]
+    assert report["event_loop_lag_ms"]["p99"] is not None
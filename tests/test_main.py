@@ -0,0 +1,108 @@
+"""
+Tests of the conversion endpoints, with a stub Edge-TTS backend.
+"""
+
+import os
+import types
+import pytest
+from fastapi.testclient import TestClient
+from app import main, tts
+from app.main import app
+from tests.test_jobs import _wait_for_job
+from tests.test_tts import FakeCommunicate
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client working in an empty directory, synthesizing with FakeCommunicate."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(tts._loaded_backends, "edge", types.SimpleNamespace(Communicate=FakeCommunicate))
+    with TestClient(app) as client:
+        yield client
+
+def test_convert_txt(client, tmp_path):
+    """Test a successful conversion and the cleanup of its upload."""
+    response = client.post("/convert", files={"file": ("livre.txt", b"Bonjour tout le monde.", "text/plain")})
+    assert response.status_code == 200
+    assert client.get(response.json()["download_url"]).content == b"\0" * 6 * len("Bonjour tout le monde.")
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+@pytest.mark.parametrize("name, content", [
+    ("vide.txt", b"  \n\n \t\n"),
+    ("casse.pdf", b"%PDF-1.4 not really a PDF"),
+    ("casse.epub", b"not a zip archive"),
+])
+def test_failed_conversion_removes_upload(client, tmp_path, name, content):
+    """Test that uploads are deleted when a conversion fails."""
+    response = client.post("/convert", files={"file": (name, content, "application/octet-stream")})
+    assert response.status_code == 422
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+@pytest.fixture
+def extraction_calls(monkeypatch):
+    """Replace run_extraction with a stub recording (file name, selection) calls."""
+    calls = []
+
+    async def run_extraction(file_path, selection=None):
+        calls.append((os.path.basename(file_path), selection))
+        return "Texte extrait du document."
+
+    monkeypatch.setattr(main, "run_extraction", run_extraction)
+    return calls
+
+@pytest.mark.parametrize("name", ["livre.pdf", "livre.epub"])
+def test_convert_twice_uses_extraction_cache(client, extraction_calls, name):
+    """Test that converting the same document again skips extraction."""
+    files = {"file": (name, b"same document bytes", "application/octet-stream")}
+
+    first = client.post("/convert", files=files).json()
+    second = client.post("/convert-with-voice", params={"voice": "fr-FR-HenriNeural"}, files=files).json()
+    assert first["extraction_cache_hit"] is False
+    assert second["extraction_cache_hit"] is True
+    assert len(extraction_calls) == 1
+
+    other = client.post("/convert", files={"file": (name, b"other document bytes", "application/octet-stream")})
+    assert other.json()["extraction_cache_hit"] is False
+    assert len(extraction_calls) == 2
+    assert client.get("/cache/stats").json()["hits"] >= 1
+
+def test_job_uses_extraction_cache(client, extraction_calls):
+    """Test that a background job reuses the extraction of a previous conversion."""
+    files = {"file": ("livre.pdf", b"same document bytes", "application/pdf")}
+    assert client.post("/convert", files=files).json()["extraction_cache_hit"] is False
+
+    job = _wait_for_job(client, client.post("/jobs", files=files).json()["status_url"])
+    assert job["status"] == "completed", job["error"]
+    assert job["result"]["extraction_cache_hit"] is True
+    assert len(extraction_calls) == 1
+
+@pytest.mark.parametrize("name, form, error", [
+    ("livre.epub", {"pages": "1-3"}, "only supported for PDF"),
+    ("livre.txt", {"pages": "1-3"}, "only supported for PDF"),
+    ("livre.pdf", {"chapters": "2"}, "only supported for EPUB"),
+    ("livre.pdf", {"pages": "1", "chapters": "2"}, "not both"),
+    ("livre.pdf", {"pages": "3-1"}, "Invalid selection"),
+    ("livre.epub", {"chapters": "deux"}, "Invalid selection"),
+])
+@pytest.mark.parametrize("endpoint", ["/convert", "/jobs"])
+def test_invalid_selection(client, extraction_calls, tmp_path, endpoint, name, form, error):
+    """Test that invalid page/chapter selections are rejected before any work."""
+    response = client.post(endpoint, data=form, files={"file": (name, b"document", "application/octet-stream")})
+    assert response.status_code == 400
+    assert error in response.json()["detail"]
+    assert extraction_calls == []
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+@pytest.mark.parametrize("name, form, selection, label", [
+    ("livre.pdf", {"pages": "2-3,5"}, [1, 2, 4], "livre_pages_2-3_5_"),
+    ("livre.epub", {"chapters": "1"}, [0], "livre_chapters_1_"),
+])
+def test_selection_reaches_extraction(client, extraction_calls, name, form, selection, label):
+    """Test that a selection is extracted as 0-based indices and named in the output."""
+    files = {"file": (name, b"document", "application/octet-stream")}
+    result = client.post("/convert", data=form, files=files).json()
+    assert extraction_calls[-1][1] == selection
+    assert result["download_url"].rsplit("/", 1)[-1].startswith(label)
+
+    # The whole document is cached separately from the selection
+    assert client.post("/convert", files=files).json()["extraction_cache_hit"] is False
+    assert extraction_calls[-1][1] is None
@@ -5,7 +5,58 @@ Unit tests for text extraction module.
 import pytest
 import os
 import tempfile
-from app.text_extraction import extract_text_from_txt, extract_text
+import zipfile
+from app.text_extraction import (
+    extract_text_from_txt, extract_text, parse_page_ranges,
+    detect_txt_encoding, iter_txt_paragraphs
+)
+
+def _write_bytes(directory, data):
+    """Write raw bytes to a .txt file and return its path."""
+    path = os.path.join(directory, "sample.txt")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+def _make_pdf(directory, page_count):
+    """Create a PDF whose pages contain "Page N"."""
+    import fitz
+
+    path = os.path.join(directory, "sample.pdf")
+    doc = fitz.open()
+    for number in range(1, page_count + 1):
+        doc.new_page().insert_text((72, 72), f"Page {number}")
+    doc.save(path)
+    doc.close()
+    return path
+
+def _make_epub(directory, chapter_count):
+    """Create a minimal EPUB whose spine items contain "Chapter N"."""
+    path = os.path.join(directory, "sample.epub")
+    manifest = "".join(
+        f'<item id="c{n}" href="text/ch{n}.xhtml" media-type="application/xhtml+xml"/>'
+        for n in range(1, chapter_count + 1)
+    )
+    # Spine order differs from manifest order on purpose
+    spine = "".join(f'<itemref idref="c{n}"/>' for n in range(chapter_count, 0, -1))
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("mimetype", "application/epub+zip")
+        archive.writestr("META-INF/container.xml", (
+            '<?xml version="1.0"?><container version="1.0" '
+            'xmlns="urn:oasis:names:tc:opendocument:xmlns:container"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        archive.writestr("OEBPS/content.opf", (
+            '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+            f'<manifest>{manifest}</manifest><spine>{spine}</spine></package>'
+        ))
+        for n in range(1, chapter_count + 1):
+            archive.writestr(
+                f"OEBPS/text/ch{n}.xhtml",
+                f"<html><body><style>p {{}}</style><p>Chapter {n}</p></body></html>"
+            )
+    return path
 
 def test_extract_text_from_txt():
     """Test TXT extraction."""
@@ -19,6 +70,66 @@ def test_extract_text_from_txt():
     finally:
         os.unlink(temp_path)
 
+def test_detect_txt_encoding():
+    """Test encoding detection from BOMs and content."""
+    assert detect_txt_encoding("é".encode("utf-8")) == ("utf-8", 0)
+    assert detect_txt_encoding("é".encode("utf-8-sig")) == ("utf-8", 3)
+    assert detect_txt_encoding("é".encode("utf-16")) == ("utf-16-le", 2)
+    assert detect_txt_encoding("été".encode("latin-1")) == ("latin-1", 0)
+    assert detect_txt_encoding("é".encode("latin-1"), complete=True) == ("latin-1", 0)
+    # Multi-byte character cut at the end of the sample is still UTF-8
+    assert detect_txt_encoding("aé".encode("utf-8")[:-1]) == ("utf-8", 0)
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "latin-1"])
+def test_extract_text_from_txt_encodings(encoding):
+    """Test TXT extraction in several encodings (BOM is dropped)."""
+    text = "Chapitre 1\n\nÉté à la mer.\n"
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_bytes(directory, text.encode(encoding))
+        assert extract_text_from_txt(path) == text
+
+@pytest.mark.parametrize("block_size", [97, 1024 * 1024])
+def test_extract_text_from_txt_late_latin1(block_size):
+    """Test a latin-1 file whose first accent comes after the detection sample."""
+    text = "a" * 70_000 + "\n\nÉté à la mer.\n"
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_bytes(directory, text.encode("latin-1"))
+        assert "".join(iter_txt_paragraphs(path, block_size=block_size)) == text
+
+def test_extract_text_from_txt_corrupt_utf8():
+    """Test that invalid bytes after real UTF-8 text are replaced."""
+    data = "Été\n".encode("utf-8") + b"a" * 70_000 + b"\xff fin"
+    with tempfile.TemporaryDirectory() as directory:
+        result = extract_text_from_txt(_write_bytes(directory, data))
+    assert result.startswith("Été\n")
+    assert result.endswith("\ufffd fin")
+
+def test_iter_txt_paragraphs_aligned_pieces():
+    """Test that TXT pieces end on paragraph breaks and rebuild the text."""
+    text = "".join(f"Paragraphe numéro {n} ééé.\n\n" for n in range(200))
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_bytes(directory, text.encode("utf-8"))
+        pieces = list(iter_txt_paragraphs(path, block_size=97))
+
+    assert "".join(pieces) == text
+    assert len(pieces) > 1
+    assert all(piece.endswith("\n\n") for piece in pieces)
+
+def test_iter_txt_paragraphs_without_breaks():
+    """Test that text without line breaks is still cut into bounded pieces."""
+    text = "mot " * 1000
+    with tempfile.TemporaryDirectory() as directory:
+        path = _write_bytes(directory, text.encode("utf-8"))
+        pieces = list(iter_txt_paragraphs(path, block_size=100))
+
+    assert "".join(pieces) == text
+    assert max(len(piece) for piece in pieces) <= 200
+
+def test_extract_text_from_empty_txt():
+    """Test TXT extraction of an empty file."""
+    with tempfile.TemporaryDirectory() as directory:
+        assert extract_text_from_txt(_write_bytes(directory, b"")) == ""
+
 def test_extract_text_invalid_file():
     """Test error handling for invalid file."""
     with pytest.raises(RuntimeError):
@@ -32,4 +143,52 @@ def test_extract_text_empty_path():
     with pytest.raises(ValueError):
         extract_text("")
 
-# TODO: Add tests for PDF and EPUB when sample files are available
+def test_parse_page_ranges():
+    """Test parsing of 1-based page/chapter selections."""
+    assert parse_page_ranges("3") == [2]
+    assert parse_page_ranges("1,3, 5-7") == [0, 2, 4, 5, 6]
+    assert parse_page_ranges("2-3,3-4") == [1, 2, 3]
+
+@pytest.mark.parametrize("spec", ["", "0", "5-2", "a-b", "1-", "-3"])
+def test_parse_page_ranges_invalid(spec):
+    """Test error handling for invalid selections."""
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec)
+
+def test_parse_page_ranges_too_large():
+    """Test that huge ranges are rejected without being expanded."""
+    with pytest.raises(ValueError, match="too large"):
+        parse_page_ranges("1-200000000")
+    with pytest.raises(ValueError, match="too large"):
+        parse_page_ranges(",".join(["1-6000"] * 2))
+    assert len(parse_page_ranges("1-10000")) == 10_000
+
+def test_extract_text_pdf_page_selection():
+    """Test that only the selected PDF pages are extracted."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _make_pdf(directory, 5)
+        assert "Page 5" in extract_text(path)
+
+        result = extract_text(path, [1, 2])
+        assert "Page 2" in result and "Page 3" in result
+        assert "Page 1" not in result and "Page 4" not in result
+
+        with pytest.raises(RuntimeError, match="out of range"):
+            extract_text(path, [9])
+
+def test_extract_text_epub_chapter_selection():
+    """Test that only the selected EPUB spine items are extracted."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = _make_epub(directory, 4)
+
+        # Spine is ch4, ch3, ch2, ch1
+        result = extract_text(path, [0, 1])
+        assert result == "Chapter 4\nChapter 3"
+
+        with pytest.raises(RuntimeError, match="out of range"):
+            extract_text(path, [4])
+
+def test_extract_text_txt_rejects_selection():
+    """Test that TXT files cannot be partially extracted."""
+    with pytest.raises(ValueError, match="not supported"):
+        extract_text("book.txt", [0])
@@ -0,0 +1,97 @@
+"""
+Unit tests for the word timing index.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.timing import TimingIndex, load_timing_index, timing_path, describe
+
+def _index(words):
+    index = TimingIndex()
+    for n in range(words):
+        index.add(n * 6, n * 400, 350, f"mot{n}")
+    return index
+
+def test_lookup_by_text_offset():
+    """Test mapping text positions to the word containing them."""
+    index = _index(10)
+    assert index.word_at_text_offset(0)["audio_offset_ms"] == 0
+    assert index.word_at_text_offset(14)["word_index"] == 2
+    assert index.word_at_text_offset(14)["word"] == "mot2"
+    assert index.word_at_text_offset(10_000)["word_index"] == 9
+
+def test_lookup_by_audio_offset():
+    """Test mapping audio time to the word being spoken."""
+    index = _index(10)
+    assert index.word_at_audio_offset(0)["text_offset"] == 0
+    assert index.word_at_audio_offset(1250)["text_offset"] == 18
+
+def test_lookup_empty_index():
+    """Test lookups on an index without words."""
+    assert TimingIndex().word_at_text_offset(5) is None
+    assert describe(TimingIndex()) == {"words": 0, "duration_ms": 0}
+
+def test_entries_must_be_ordered():
+    """Test that out-of-order entries are rejected."""
+    index = _index(2)
+    with pytest.raises(ValueError):
+        index.add(0, 10_000, 100)
+
+def test_save_and_load(tmp_path):
+    """Test the binary round trip and the next-to-audio location."""
+    audio = tmp_path / "book.mp3"
+    index = _index(100_000)
+    index.save(timing_path(audio))
+
+    # 4 arrays of 4-byte integers, the words and a small header
+    assert timing_path(audio).stat().st_size < 100_000 * (16 + 8) + 64
+
+    loaded = load_timing_index(audio)
+    assert len(loaded) == 100_000
+    assert loaded.word_at_audio_offset(39_999_999)["word_index"] == 99_999
+    assert loaded.word_at_audio_offset(39_999_999)["word"] == "mot99999"
+    assert describe(loaded)["duration_ms"] == 99_999 * 400 + 350
+
+def test_load_missing_index(tmp_path):
+    """Test that missing indexes return None."""
+    assert load_timing_index(tmp_path / "missing.mp3") is None
+
+def test_load_invalid_file(tmp_path):
+    """Test error handling for files that are not timing indexes."""
+    path = tmp_path / "bad.timing"
+    path.write_bytes(b"garbage-header")
+    with pytest.raises(ValueError):
+        TimingIndex.load(path)
+
+def test_load_truncated_file(tmp_path):
+    """Test that truncated indexes raise ValueError rather than EOFError."""
+    path = tmp_path / "book.timing"
+    _index(10).save(path)
+    data = path.read_bytes()
+    for size in (4, len(data) - 50, len(data) - 1):
+        path.write_bytes(data[:size])
+        with pytest.raises(ValueError):
+            TimingIndex.load(path)
+
+def test_timing_endpoint_unreadable_index(tmp_path, monkeypatch):
+    """Test that /timing answers 404, not 500, for a corrupt index."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "outputs").mkdir()
+    (tmp_path / "outputs" / "book.timing").write_bytes(b"ABTI")
+
+    response = TestClient(app).get("/timing/book.mp3", params={"audio_time": 1.0})
+    assert response.status_code == 404
+
+@pytest.mark.parametrize("params", [
+    {"audio_time": "nan"}, {"audio_time": "inf"}, {"audio_time": "-1"}, {"text_offset": "-1"},
+])
+def test_timing_endpoint_invalid_position(tmp_path, monkeypatch, params):
+    """Test that negative or non-finite positions are rejected with a 400."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "outputs").mkdir()
+    _index(10).save(tmp_path / "outputs" / "book.timing")
+
+    client = TestClient(app)
+    assert client.get("/timing/book.mp3", params={"audio_time": 1.0}).status_code == 200
+    assert client.get("/timing/book.mp3", params=params).status_code == 400
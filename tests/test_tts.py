@@ -5,8 +5,26 @@ Unit tests for TTS module.
 import pytest
 import asyncio
 import os
+import types
 from pathlib import Path
-from app.tts import list_french_voices, generate_audio
+from app import tts
+from app.tts import list_french_voices, generate_audio, generate_audio_chapters, split_text, iter_chunks
+from app.timing import load_timing_index
+
+class FakeCommunicate:
+    """Edge-TTS stand-in: 6 bytes (1 ms) of audio per character, one boundary per word."""
+
+    def __init__(self, text, voice, boundary="SentenceBoundary"):
+        self.text = text
+
+    async def stream(self):
+        position = 0
+        for word in self.text.split():
+            position = self.text.index(word, position)
+            yield {"type": "WordBoundary", "offset": position * 10_000,
+                   "duration": len(word) * 10_000, "text": word}
+            position += len(word)
+        yield {"type": "audio", "data": b"\0" * 6 * len(self.text)}
 
 @pytest.mark.asyncio
 async def test_list_french_voices():
@@ -52,6 +70,104 @@ async def test_generate_audio_basic():
             # Clean up
             os.unlink(result)
 
+def test_split_text_short():
+    """Test that short text stays in a single chunk."""
+    assert split_text("Hello world") == ["Hello world"]
+
+def test_split_text_paragraphs():
+    """Test that chunks are cut on paragraph boundaries."""
+    text = "First paragraph.\n\nSecond paragraph.\nThird one."
+    chunks = split_text(text, max_chars=30)
+    assert chunks == ["First paragraph.", "Second paragraph.\nThird one."]
+
+def test_split_text_long_sentence():
+    """Test that oversized paragraphs are cut below the limit."""
+    text = "One sentence here. " * 50
+    chunks = split_text(text, max_chars=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_iter_chunks_joins_lines_across_pieces():
+    """Test that a line split between two pieces is not cut in two."""
+    chunks = list(iter_chunks(["Hello wo", "rld\nSecond line\n"], max_chars=12))
+    assert chunks == ["Hello world", "Second line"]
+
+def test_iter_chunks_without_line_breaks():
+    """Test that text without newlines is chunked as it arrives, not accumulated."""
+    source = "Une phrase sans fin, et encore des mots. " * 1000
+    pieces = [source[start:start + 1000] for start in range(0, len(source), 1000)]
+    consumed = []
+
+    def stream():
+        for piece in pieces:
+            consumed.append(piece)
+            yield piece
+
+    chunk_spans = tts._iter_chunk_spans(stream(), 100)
+    next(chunk_spans)
+    assert len(consumed) == 1
+
+    chunks = list(iter_chunks(pieces, max_chars=100))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == source.split()
+    for chunk, spans in tts._iter_chunk_spans(pieces, 100):
+        assert source.startswith(chunk, tts._source_offset(spans, 0))
+
+@pytest.mark.asyncio
+async def test_generate_audio_chapters_timing_index(tmp_path, monkeypatch):
+    """Test that word timings are mapped to source text across chunks."""
+    monkeypatch.setattr(tts, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(tts, "CHUNK_MAX_CHARS", 20)
+    monkeypatch.setitem(tts._loaded_backends, "edge", types.SimpleNamespace(Communicate=FakeCommunicate))
+
+    source = "  Premier mot ici.\n\n  Deuxième paragraphe long\n"
+    audio_path = await generate_audio_chapters([source[:10], source[10:]], "timed")
+
+    index = load_timing_index(audio_path)
+    words = source.split()
+    assert len(index) == len(words)
+    for number, word in enumerate(words):
+        assert source[index.text_offsets[number]:].startswith(word)
+
+    # Second chunk ("Deuxième paragraphe") starts after the 16 ms of the first one
+    second = index.word_at_text_offset(source.index("Deuxième"))
+    assert second["audio_offset_ms"] == len("Premier mot ici.")
+    assert index.word_at_audio_offset(second["audio_offset_ms"])["text_offset"] == source.index("Deuxième")
+
+class MalformedCommunicate(FakeCommunicate):
+    """Emits word boundaries without text or going back in time."""
+
+    async def stream(self):
+        yield {"type": "WordBoundary", "offset": 0, "duration": 10_000}
+        async for message in super().stream():
+            yield message
+        yield {"type": "WordBoundary", "offset": 0, "duration": -10_000, "text": self.text.split()[0]}
+
+@pytest.mark.asyncio
+async def test_generate_audio_chapters_malformed_boundaries(tmp_path, monkeypatch):
+    """Test that bad word boundary events only lose their own timing."""
+    monkeypatch.setattr(tts, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setitem(tts._loaded_backends, "edge", types.SimpleNamespace(Communicate=MalformedCommunicate))
+
+    audio_path = await generate_audio_chapters("Premier mot ici.", "malformed")
+
+    assert audio_path.endswith(".mp3")
+    assert os.path.getsize(audio_path) == 6 * len("Premier mot ici.")
+    index = load_timing_index(audio_path)
+    assert [index.word(n) for n in range(len(index))] == ["Premier", "mot", "ici."]
+
+@pytest.mark.asyncio
+async def test_generate_audio_chapters_empty_pieces():
+    """Test error handling for pieces containing no text."""
+    with pytest.raises(ValueError, match="Text cannot be empty"):
+        await generate_audio_chapters(["\n", "  \n"], "test")
+
+@pytest.mark.asyncio
+async def test_generate_audio_chapters_empty_text():
+    """Test error handling for empty text."""
+    with pytest.raises(ValueError, match="Text cannot be empty"):
+        await generate_audio_chapters("", "test")
+
 # Note: Full integration tests with actual TTS would require:
 # - Internet connection for Edge-TTS
 # - Audio file verification